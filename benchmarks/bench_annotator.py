@@ -0,0 +1,82 @@
+"""
+Compare the old per-lesson teacher / room regex scans against compasswidget.annotator.LessonAnnotator
+Run from the repo root: python benchmarks/bench_annotator.py --staff 2000 --days 70
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'compasswidget'))
+
+from annotator import LessonAnnotator
+
+
+# The path processClasses.py used before LessonAnnotator: O(lessons x staff x regex compile)
+def get_teacher_name(teachers, code):
+    for teacher in teachers:
+        if teacher.displayCode == code:
+            return teacher.n  # Full name
+    return None
+
+def get_teacher_code(teachers,backup=None):
+    for i in [teacher.displayCode for teacher in teachers]:
+        if i in backup:
+            if bool(re.search(rf'(^|\W){re.escape(i)}(\W|$)', backup)):
+                return get_teacher_name(teachers,i)
+
+    return None
+
+def legacy(lines, teachers, rooms):
+    return [(get_teacher_code(teachers, line), next((room.n for room in rooms if re.search(rf'(^|\W){re.escape(room.n)}(\W|$)', line)), "NA")) for line in lines]
+
+
+def synthetic(staff, room_count, days, per_day, seed=1):
+    rng = random.Random(seed)
+    letters = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+    codes = set()
+    while len(codes) < staff:
+        codes.add(''.join(rng.choice(letters) for _ in range(3)) + (str(rng.randrange(10)) if rng.random() < 0.3 else ''))
+    teachers = [SimpleNamespace(displayCode=c, n=f"Teacher {c}") for c in sorted(codes)]
+    rooms = [SimpleNamespace(n=f"{rng.choice(['MC', 'LH', 'SH', 'MET', 'TW'])}{i:02d}") for i in range(room_count)]
+    # A term repeats a fortnightly cycle of classes
+    classes = [f"{rng.randrange(7, 13)}{rng.choice(['ENG', 'MAT', 'SCI', 'HIS'])}{rng.randrange(1, 6)} - {rng.choice(rooms).n} - {rng.choice(teachers).displayCode} (Subject {i})" for i in range(per_day * 10)]
+    lines = [classes[(d % 10) * per_day + p] for d in range(days) for p in range(per_day)]
+    return teachers, rooms, lines
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--staff', type=int, default=2000)
+    parser.add_argument('--rooms', type=int, default=300)
+    parser.add_argument('--days', type=int, default=70)
+    parser.add_argument('--per-day', type=int, default=6)
+    args = parser.parse_args()
+
+    teachers, rooms, lines = synthetic(args.staff, args.rooms, args.days, args.per_day)
+    print(f"{len(lines)} lessons, {len(teachers)} staff, {len(rooms)} rooms")
+
+    start = time.perf_counter()
+    old = legacy(lines, teachers, rooms)
+    old_time = time.perf_counter() - start
+    print(f"{'legacy regex scans':<28}{old_time * 1000:>10.1f} ms")
+
+    start = time.perf_counter()
+    annotator = LessonAnnotator(teachers, rooms)
+    build_time = time.perf_counter() - start
+    start = time.perf_counter()
+    new = [(teacher, room or "NA") for teacher, room in annotator.annotate_all(lines)]
+    new_time = time.perf_counter() - start
+    print(f"{'LessonAnnotator build':<28}{build_time * 1000:>10.1f} ms")
+    print(f"{'LessonAnnotator annotate':<28}{new_time * 1000:>10.1f} ms")
+    print(f"{'speedup (incl. build)':<28}{old_time / (build_time + new_time):>10.1f}x")
+    mismatches = sum(a != b for a, b in zip(old, new))
+    print(f"{'mismatches':<28}{mismatches:>10}")
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == '__main__':
+    main()
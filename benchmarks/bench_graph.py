@@ -0,0 +1,83 @@
+"""
+Paint time of compasswidget.graph.TimelineGraph with and without the cached background layer, and while
+scrolling a week view through a term of lessons (--term-days), and with --dense events on screen at once
+Renders offscreen, run from the repo root: QT_QPA_PLATFORM=offscreen python benchmarks/bench_graph.py --events 12
+"""
+import argparse
+import os
+import statistics
+import sys
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'compasswidget'))
+
+from PyQt6.QtGui import QColor, QImage
+from PyQt6.QtWidgets import QApplication
+
+from eventstore import EventStore
+from graph import Event, TimelineGraph
+
+_app = None  # Kept referenced, an unreferenced QApplication is deleted straight away
+
+
+def events(n):
+    # A school day of lessons with some overlaps, repeated for bigger n
+    return [Event(f"Lesson {i}", 8 * 60 + 50 + (i * 37) % 420, 8 * 60 + 50 + (i * 37) % 420 + 50,
+                  QColor(200, 50, 50, 150), QColor(255, 0, 0), f"Room {i}") for i in range(n)]
+
+
+def term(days, per_day):
+    first = date(2025, 2, 3)
+    return [Event(f"Lesson {p}", 8 * 60 + 50 + p * 60, 8 * 60 + 50 + p * 60 + 50, secondary_text=f"Room {p}",
+                  day=first + timedelta(days=d)) for d in range(days) for p in range(per_day)]
+
+
+def measure(graph, frames, scroll=False):
+    image = QImage(graph.size(), QImage.Format.Format_ARGB32_Premultiplied)
+    graph.paint_times.clear()
+    for i in range(frames):
+        if scroll:
+            # A notch of scrolling each frame, back and forth through the day and across the term
+            graph.scroll_to(hour=8 + (i % 20) * 0.25, day=graph.days[i % len(graph.days)])
+        image.fill(0)
+        graph.render(image)
+    times = list(graph.paint_times)[1:]  # The first paint also lays out / fills the cache
+    return statistics.median(times), max(times)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--events', type=int, default=12)
+    parser.add_argument('--frames', type=int, default=200)
+    parser.add_argument('--width', type=int, default=600)
+    parser.add_argument('--height', type=int, default=800)
+    parser.add_argument('--term-days', type=int, default=70)
+    parser.add_argument('--dense', type=int, default=3000, help="Events spread over 20 day columns, all visible")
+    args = parser.parse_args()
+
+    global _app
+    _app = QApplication(sys.argv)
+    print(f"{args.events} events, {args.width}x{args.height}, {args.frames} frames")
+    for cache in (False, True):
+        graph = TimelineGraph(events(args.events), h_padding=3, cache_background=cache)
+        graph.resize(args.width, args.height)
+        median, worst = measure(graph, args.frames)
+        print(f"{'cached background' if cache else 'full repaint':<20}{median:>8.3f} ms median{worst:>8.3f} ms max")
+
+    graph = TimelineGraph(term(args.term_days, 6), visible_days=5, visible_hours=4)
+    graph.resize(args.width * 2, args.height)
+    median, worst = measure(graph, args.frames, scroll=True)
+    print(f"{f'scroll {len(graph.events)} lessons':<20}{median:>8.3f} ms median{worst:>8.3f} ms max")
+
+    dense = term(20, args.dense // 20)
+    for i, ev in enumerate(dense):
+        ev.start_hour = 8 + (i * 7) % 480 / 60  # Overlapping, so the layout has work to do
+        ev.end_hour = ev.start_hour + 0.5
+    graph = TimelineGraph(EventStore.from_events(dense), h_padding=1, visible_days=20)
+    graph.resize(args.width * 3, args.height)
+    median, worst = measure(graph, args.frames // 4)
+    print(f"{f'{len(dense)} events':<20}{median:>8.3f} ms median{worst:>8.3f} ms max")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""
+Compare per-row parse_obj against the batch / projection / record parse modes in compasspy.models
+Run from the repo root: python benchmarks/bench_parse.py --rows 20000
+"""
+import argparse
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from compasspy.models import User, parseList
+
+
+def synthetic_staff(n):
+    return [{
+        "__type": "User:http://jdlf.com.au/ns/data/users",
+        "id": i,
+        "sussiId": f"S{i:06d}",
+        "userStatus": 1,
+        "n": f"Firstname{i} Lastname{i}",
+        "fn": f"Firstname{i}",
+        "ln": f"Lastname{i}",
+        "namePrefFirst": None,
+        "namePrefLastId": f"Lastname{i}, Firstname{i} (T{i:04d})",
+        "nif": f"Firstname{i} Lastname{i} (T{i:04d})",
+        "ns": f"Firstname{i} LASTNAME{i}",
+        "campusId": 1,
+        "baseRole": 2,
+        "ce": None,
+        "displayCode": f"T{i:04d}",
+        "ii": f"T{i:04d}",
+        "mobileNumber": None,
+        "nameFirstPrefLastIdForm": f"Firstname{i} Lastname{i} (T{i:04d})",
+        "doNotContact": False,
+        "f": None,
+        "start": "2020-01-28T00:00:00",
+        "finish": None,
+        "govtCode1": None,
+        "govtCode2": None,
+        "hasRegisteredDevice": bool(i % 2)
+    } for i in range(n)]
+
+
+def per_row(rows):
+    a = []
+    for f in rows:
+        a += [User.parse_obj(f)]
+    return a
+
+
+def measure(name, func, rows, repeat):
+    best = None
+    for _ in range(repeat):
+        gc.collect()
+        start = time.process_time()
+        func(rows)
+        elapsed = time.process_time() - start
+        best = elapsed if best is None else min(best, elapsed)
+    gc.collect()
+    tracemalloc.start()
+    result = func(rows)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    del result
+    print(f"{name:<28}{best * 1000:>10.1f} ms{peak / 1024 / 1024:>10.1f} MiB")
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    rows = synthetic_staff(args.rows)
+    fields = ['displayCode', 'n']
+    print(f"{args.rows} staff rows, best of {args.repeat} (CPU time, peak traced memory)")
+    print(f"{'mode':<28}{'cpu':>13}{'peak':>14}")
+    base = measure('parse_obj per row', per_row, rows, args.repeat)
+    for name, func in [
+        ('parseList (batch)', lambda r: parseList(User, r)),
+        ('parseList fields=2', lambda r: parseList(User, r, fields)),
+        ('records (all fields)', lambda r: parseList(User, r, records=True)),
+        ('records fields=2', lambda r: parseList(User, r, fields, records=True)),
+    ]:
+        t = measure(name, func, rows, args.repeat)
+        print(f"{'':<28}{base / t:>9.1f}x faster")
+
+
+if __name__ == '__main__':
+    main()
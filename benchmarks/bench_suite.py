@@ -0,0 +1,127 @@
+"""
+Benchmark suite for the compasspy / timetable pipeline against the local fake Compass server
+Each case reports the median wall time of --repeat runs. --save stores them as the baseline for this machine,
+--check compares against it and exits 1 on a regression bigger than --tolerance, or a case without a baseline.
+Timings only compare on the machine that recorded them, so baseline.json is not committed: record one locally
+before changing anything, then check against it.
+Run from the repo root: python benchmarks/bench_suite.py --save, then python benchmarks/bench_suite.py --check
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+from types import SimpleNamespace
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..'))
+sys.path.insert(0, os.path.join(HERE, '..', 'compasswidget'))
+
+from compasspy.client import Compass
+from compasspy.asyncclient import AsyncCompass
+from compasspy.models import User, parseList
+from annotator import LessonAnnotator
+from lessons import normalize_lessons
+from timetable import fetch_timetable, locations
+from fakecompass import FakeCompass, synthetic_lessons, synthetic_staff, synthetic_locations
+
+DEFAULT_BASELINE = os.path.join(HERE, 'baseline.json')
+DAY = '7/02/2025'
+
+
+def cases(fake):
+    """name -> function running one iteration"""
+    client = Compass('fake', 'cookie', apiEndpoint=fake.url, login=True)
+    staff_rows = synthetic_staff(2000)
+    staff = parseList(User, staff_rows, ['displayCode', 'n'], records=True)
+    rooms = synthetic_locations(200)
+    room_records = [SimpleNamespace(n=r['n']) for r in rooms]
+    term = [row for d in range(70) for row in synthetic_lessons(f'{d % 28 + 1}/02/2025', 6, staff_rows, rooms)]
+
+    def end_to_end():
+        async def run():
+            async with AsyncCompass('fake', 'cookie', apiEndpoint=fake.url) as c:
+                return await fetch_timetable(c, DAY)
+        return asyncio.run(run())
+
+    return client, {
+        'roundtrip getAccount x20': lambda: [client._json('POST', 'Accounts.svc/GetAccount') for _ in range(20)],
+        'getTimetableRange 20 days': lambda: client.getTimetableRange('3/02/2025', '28/02/2025', skipWeekends=True),
+        'iterStaff records': lambda: list(client.iterStaff(fields=['displayCode', 'n'], records=True)),
+        'parse 2000 staff (models)': lambda: parseList(User, staff_rows),
+        'parse 2000 staff (records)': lambda: parseList(User, staff_rows, ['displayCode', 'n'], records=True),
+        'annotate term (420 lessons)': lambda: normalize_lessons(term, LessonAnnotator(staff, room_records, locations)),
+        'end to end fetch_timetable': end_to_end,
+    }
+
+
+def measure(func, repeat):
+    func()  # Warm up (connections, projections, regexes)
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--latency', type=float, default=0.005, help="Fake server latency per request, seconds")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--save', action='store_true', help="Store these results as the baseline")
+    parser.add_argument('--check', action='store_true', help="Exit 1 if a case is slower than baseline * (1 + tolerance)")
+    parser.add_argument('--tolerance', type=float, default=0.25)
+    parser.add_argument('-k', default='', help="Only run cases whose name contains this")
+    args = parser.parse_args()
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    elif args.check:
+        # Nothing to compare with would otherwise pass every check
+        print(f"No baseline at {args.baseline}, record one on this machine with --save first")
+        sys.exit(1)
+    if baseline.get('latency', args.latency) != args.latency:
+        print(f"Baseline was recorded with --latency {baseline['latency']}, comparing anyway")
+
+    results = {}
+    regressions = []
+    with FakeCompass(latency=args.latency, staff=2000, locations=200) as fake:
+        client, suite = cases(fake)
+        print(f"{'case':<32}{'median':>12}{'baseline':>12}")
+        for name, func in suite.items():
+            if args.k not in name:
+                continue
+            ms = results[name] = measure(func, args.repeat)
+            base = baseline.get('cases', {}).get(name)
+            note = '  no baseline' if args.check else ''
+            if base:
+                note = f"{base:>10.1f}ms {ms / base - 1:+.0%}"
+                if ms > base * (1 + args.tolerance):
+                    regressions.append(name)
+                    note += '  REGRESSION'
+            print(f"{name:<32}{ms:>10.1f}ms{note:>12}")
+        client.close()
+
+    if args.save:
+        cases_saved = dict(baseline.get('cases', {}), **{name: round(ms, 2) for name, ms in results.items()})
+        with open(args.baseline, 'w') as f:
+            json.dump({'latency': args.latency, 'repeat': args.repeat, 'cases': cases_saved}, f, indent=2)
+        print(f"Saved baseline to {args.baseline}")
+    if args.check:
+        missing = [name for name in results if name not in baseline.get('cases', {})]
+        if missing:
+            print(f"No baseline for {', '.join(missing)}, record it with --save")
+        if regressions:
+            print(f"{len(regressions)} regression(s): {', '.join(regressions)}")
+        if missing or regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""
+Range queries on a term of lessons: compasswidget.termstore.TermStore (memory-mapped numpy rows) against scanning
+the same Lesson list, plus the cost of saving and opening the store
+Run from the repo root: python benchmarks/bench_termstore.py --days 200 --lessons 40
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'compasswidget'))
+
+from lessons import Lesson
+from termstore import TermStore
+
+
+def term(first_day, days, per_day, rooms=60):
+    lessons = []
+    for d in range(days):
+        day = first_day + timedelta(days=d)
+        for p in range(per_day):
+            start = 8 * 60 + 50 + (p % 6) * 60
+            lessons.append(Lesson(f"{d}-{p}", p, day, start, start + 50, f"Subject {p % 30}", f"S{p % 30}", "",
+                                  f"Teacher {p % 80}", f"R{p % rooms:03d}", 1 if p % 17 else 0, False))
+    return lessons
+
+
+def timed(func, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return (time.perf_counter() - start) / repeat * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--days', type=int, default=200)
+    parser.add_argument('--lessons', type=int, default=40, help="Lessons per day (Eg. every class of a school)")
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    first_day = date(2025, 2, 3)
+    lessons = term(first_day, args.days, args.lessons)
+    middle = first_day + timedelta(days=args.days // 2)
+    week = (datetime.combine(middle, datetime.min.time()), datetime.combine(middle + timedelta(days=7), datetime.min.time()))
+    after = middle.toordinal() * 1440
+
+    start = time.perf_counter()
+    store = TermStore.build(lessons)
+    print(f"{len(lessons)} lessons, built in {(time.perf_counter() - start) * 1000:.0f}ms")
+
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, 'term')
+        save, _ = timed(lambda: store.save(path), 5)
+        load, opened = timed(lambda: TermStore.open(path), 50)
+        print(f"save {save:.2f}ms, open {load:.3f}ms")
+
+        queries = {
+            'one day': (lambda: len(opened.on(middle)),
+                        lambda: sum(1 for l in lessons if l.day == middle)),
+            'week in a room': (lambda: len(opened.room_occupancy('R007', *week)),
+                               lambda: sum(1 for l in lessons if l.room == 'R007' and l.running and week[0].date() <= l.day < week[1].date())),
+            'next with teacher': (lambda: int(opened.next_with(week[0], teacher='Teacher 7')['key']),
+                                  lambda: min(l.day.toordinal() * 1440 + l.start for l in lessons
+                                              if l.teacher == 'Teacher 7' and l.running and l.day.toordinal() * 1440 + l.start > after)),
+        }
+        print(f"{'query':<20}{'store':>12}{'list scan':>12}")
+        for name, (indexed, scan) in queries.items():
+            fast, a = timed(indexed, args.repeat)
+            slow, b = timed(scan, max(1, args.repeat // 20))
+            assert a == b, (name, a, b)
+            print(f"{name:<20}{fast:>10.3f}ms{slow:>10.3f}ms  x{slow / fast:,.0f}")
+        opened = None  # Unmap before the folder is removed (Windows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""
+Load many accounts' timetables into compasswidget.transitions.TransitionScheduler and measure
+timer count, memory, scheduling / rescheduling cost and firing throughput on one core
+Run from the repo root: python benchmarks/bench_transitions.py --accounts 5000 --days 5
+"""
+import argparse
+import gc
+import os
+import sys
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'compasswidget'))
+
+from lessons import Lesson
+from changefeed import Change, ROOM
+from transitions import TransitionScheduler
+
+
+def timetable(account, first_day, days, per_day):
+    lessons = []
+    for d in range(days):
+        day = first_day + timedelta(days=d)
+        for p in range(per_day):
+            start = 8 * 60 + 50 + p * 60
+            lessons.append(Lesson(f"{account}-{d}-{p}", p, day, start, start + 50, f"Subject {p}", f"S{p}", "", "Teacher", f"R{p:03d}", 1, False))
+    return lessons
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--accounts', type=int, default=5000)
+    parser.add_argument('--days', type=int, default=5)
+    parser.add_argument('--lessons', type=int, default=6, help="Lessons per day")
+    args = parser.parse_args()
+
+    first_day = date.today() + timedelta(days=1)
+    timetables = {a: timetable(a, first_day, args.days, args.lessons) for a in range(args.accounts)}
+    fired = []
+    scheduler = TransitionScheduler(lambda *event: fired.append(event))
+    now = time.time()
+
+    # Memory on a throwaway scheduler, tracemalloc slows the timed load down too much
+    gc.collect()
+    tracemalloc.start()
+    traced = TransitionScheduler(lambda *event: None)
+    for account, lessons in timetables.items():
+        traced.set_lessons(account, lessons, now)
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del traced
+    gc.collect()
+
+    start = time.perf_counter()
+    for account, lessons in timetables.items():
+        scheduler.set_lessons(account, lessons, now)
+    load = time.perf_counter() - start
+    print(f"{args.accounts} accounts, {len(scheduler)} timers loaded in {load * 1000:.0f}ms "
+          f"({load / len(scheduler) * 1e6:.2f}us each), {memory / 1024 / 1024:.1f} MiB ({memory / len(scheduler):.0f} B/timer)")
+
+    # A room change for one lesson of every account
+    changes = {a: [Change(ROOM, l.key, l, Lesson(l.instance_id, l.activity_id, l.day, l.start, l.finish, l.title, l.short_title, l.line, l.teacher, "R999", 1, False))]
+               for a, lessons in timetables.items() for l in lessons[:1]}
+    start = time.perf_counter()
+    for account, change in changes.items():
+        scheduler.apply_changes(account, change, now)
+    reschedule = time.perf_counter() - start
+    print(f"{len(changes)} lesson reschedules in {reschedule * 1000:.0f}ms ({reschedule / len(changes) * 1e6:.2f}us each)")
+
+    start = time.perf_counter()
+    count = scheduler.run_due(now + args.days * 86400 + 86400 * 2)
+    elapsed = time.perf_counter() - start
+    print(f"Fired {count} transitions in {elapsed * 1000:.0f}ms ({count / elapsed:,.0f}/s), {len(scheduler)} timers left")
+
+
+if __name__ == '__main__':
+    main()
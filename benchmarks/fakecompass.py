@@ -0,0 +1,249 @@
+"""
+Local stand-in for the Compass API, serving synthetic (or recorded) payloads with configurable
+latency, payload size and failure injection
+Point a client at it with Compass(..., apiEndpoint=server.url)
+Run from the repo root: python benchmarks/fakecompass.py --port 8123 --latency 0.05 --failure-rate 0.01
+"""
+import argparse
+import json
+import os
+import random
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+SUBJECTS = ['English', 'Mathematics', 'Science', 'History', 'Geography', 'Art', 'Music', 'Drama', 'Physical Education', 'French']
+
+
+def synthetic_staff(n, pad=0):
+    return [{
+        "__type": "User:http://jdlf.com.au/ns/data/users",
+        "id": i, "sussiId": f"S{i:06d}", "userStatus": 1,
+        "n": f"Firstname{i} Lastname{i}", "fn": f"Firstname{i}", "ln": f"Lastname{i}", "namePrefFirst": None,
+        "namePrefLastId": f"Lastname{i}, Firstname{i} (T{i:04d})", "nif": f"Firstname{i} Lastname{i} (T{i:04d})",
+        "ns": f"Firstname{i} LASTNAME{i}", "campusId": 1, "baseRole": 2, "ce": None,
+        "displayCode": f"T{i:04d}", "ii": f"T{i:04d}", "mobileNumber": None,
+        "nameFirstPrefLastIdForm": f"Firstname{i} Lastname{i} (T{i:04d})", "doNotContact": False, "f": None,
+        "start": "2020-01-28T00:00:00", "finish": None, "govtCode1": None, "govtCode2": None,
+        "hasRegisteredDevice": bool(i % 2), "pad": "x" * pad,
+    } for i in range(n)]
+
+
+def synthetic_locations(n, pad=0):
+    return [{
+        "__type": "Location:http://jdlf.com.au/ns/data/locations",
+        "id": i, "roomName": f"R{i:03d}", "n": f"R{i:03d}", "longName": f"Room {i}", "building": f"B{i // 20}",
+        "archived": False, "pad": "x" * pad,
+    } for i in range(n)]
+
+
+def synthetic_tasks(n, pad=0):
+    return [{
+        "__type": "Task:http://jdlf.com.au/ns/data/tasks",
+        "id": i, "taskName": f"Task {i}", "status": bool(i % 3 == 0), "dueDate": None, "pad": "x" * pad,
+    } for i in range(n)]
+
+
+def synthetic_lessons(day, n, staff, locations, pad=0):
+    """One school day of GetScheduleLinesForDate rows, the same every time for the same day"""
+    rng = random.Random(day)
+    rows = []
+    for p in range(n):
+        start = 8 * 60 + 50 + p * 60
+        subject = rng.choice(SUBJECTS)
+        teacher = rng.choice(staff)["displayCode"] if staff else "T0000"
+        room = rng.choice(locations)["n"] if locations else "R000"
+        rows.append({
+            "__type": "CalendarTransport:http://jdlf.com.au/ns/business/calendar",
+            "activityId": 1000 + p, "activityType": 1, "instanceId": f"{day}-{p}",
+            "topTitleLine": f"{subject[:3].upper()}{p}", "bottomTitleLine": "",
+            "topAndBottomLine": f"10{subject[:3].upper()}{p} - {room} - {teacher} ({subject})",
+            "allDay": False,
+            "start": f"{day} - {(start // 60 - 1) % 12 + 1}:{start % 60:02d} {'am' if start < 720 else 'pm'}",
+            "finish": f"{day} - {((start + 50) // 60 - 1) % 12 + 1}:{(start + 50) % 60:02d} {'am' if start + 50 < 720 else 'pm'}",
+            "rollMarked": False, "runningStatus": 1 if rng.random() > 0.05 else 2, "attendanceMode": 0,
+            "backgroundColor": "#dce6f4", "pad": "x" * pad,
+        })
+    return rows
+
+
+class FakeCompass:
+    """
+    Threaded HTTP server answering the endpoints compasspy calls
+    Accounts.svc/GetAccount, User.svc/GetAllStaff, ReferenceDataCache.svc/GetAllLocations,
+    mobile.svc/GetScheduleLinesForDate, TaskService.svc/GetTaskItems and TaskService.svc/SaveTaskItem
+    """
+
+    def __init__(self, port=0, latency=0.0, jitter=0.0, staff=200, locations=100, lessons=6, tasks=50, pad=0,
+                 failure_rate=0.0, failure_status=500, html_rate=0.0, recorded=None, seed=0):
+        """
+        :param port: Port to listen on (Default: any free one)
+        :param latency: Seconds added to every response
+        :param jitter: Up to this many extra random seconds per response
+        :param staff / locations / tasks: Rows the list endpoints have
+        :param lessons: Lessons per day
+        :param pad: Extra bytes per row, to grow payloads without more rows
+        :param failure_rate: Share of requests answered with failure_status
+        :param html_rate: Share of requests answered with an HTML error page (what a Cloudflare block looks like to _json)
+        :param recorded: Directory of recorded responses named after the endpoint, Eg. User.svc_GetAllStaff.json
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.lessons = lessons
+        self.pad = pad
+        self.failure_rate = failure_rate
+        self.failure_status = failure_status
+        self.html_rate = html_rate
+        self.random = random.Random(seed)
+        self.stats = Counter()  # endpoint -> requests
+        self.failures = Counter()
+        self._lock = threading.Lock()
+
+        self.account = {"__type": "Account", "userId": 1, "firstName": "Fake", "lastName": "Student", "name": "Fake Student",
+                        "isWalletEnabled": False}
+        self.staff = synthetic_staff(staff, pad)
+        self.locations = synthetic_locations(locations, pad)
+        self.tasks = synthetic_tasks(tasks, pad)
+        self.recorded = {}
+        if recorded:
+            for name in os.listdir(recorded):
+                if name.endswith('.json'):
+                    with open(os.path.join(recorded, name)) as f:
+                        self.recorded[name[:-5].replace('_', '/', 1)] = json.load(f)
+            # Recorded lists replace the synthetic ones, and still get paged
+            self.staff = self.recorded.pop('User.svc/GetAllStaff', {}).get('d', self.staff)
+            self.locations = self.recorded.pop('ReferenceDataCache.svc/GetAllLocations', {}).get('d', self.locations)
+            self.tasks = self.recorded.pop('TaskService.svc/GetTaskItems', {}).get('d', self.tasks)
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', port), self._handler())
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        """API endpoint to give Compass(apiEndpoint=...)"""
+        return f'http://127.0.0.1:{self.server.server_port}/Services/'
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    @staticmethod
+    def _page(rows, start, limit):
+        return {"d": rows[start:start + limit]}
+
+    def respond(self, method, path, query, body):
+        """
+        :return: (status, content type, body bytes)
+        """
+        if path in self.recorded:
+            return 200, 'application/json', json.dumps(self.recorded[path]).encode()
+        if path == 'Accounts.svc/GetAccount':
+            data = {"d": self.account}
+        elif path == 'User.svc/GetAllStaff':
+            data = self._page(self.staff, int(body.get('start', 0)), int(body.get('limit', 50)))
+        elif path == 'ReferenceDataCache.svc/GetAllLocations':
+            data = self._page(self.locations, int(query.get('start', ['0'])[0]), int(query.get('limit', ['50'])[0]))
+        elif path == 'TaskService.svc/GetTaskItems':
+            data = self._page(self.tasks, int(body.get('start', 0)), int(body.get('limit', 50)))
+        elif path == 'TaskService.svc/SaveTaskItem':
+            with self._lock:
+                self.tasks.append({"id": len(self.tasks), "taskName": body.get('task', {}).get('taskName'), "status": False, "dueDate": None})
+                data = {"d": len(self.tasks) - 1}
+        elif path == 'mobile.svc/GetScheduleLinesForDate':
+            day = body.get('date', datetime.now().strftime('%d/%m/%Y')).split(' - ')[0]
+            data = {"d": {"__type": "GenericMobileResponse", "data": synthetic_lessons(day, self.lessons, self.staff, self.locations, self.pad)}}
+        else:
+            return 404, 'text/plain', b'Not found'
+        return 200, 'application/json', json.dumps(data).encode()
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'  # Keep-alive, like Compass
+            # Headers and body in one segment, otherwise delayed ACKs add ~40ms to every keep-alive response
+            disable_nagle_algorithm = True
+            wbufsize = -1
+
+            def _send(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                raw = self.rfile.read(length) if length else b''
+                path, _, query = self.path.split('/Services/', 1)[-1].partition('?')
+                with fake._lock:
+                    fake.stats[path] += 1
+                    roll = fake.random.random()
+                    delay = fake.latency + (fake.random.uniform(0, fake.jitter) if fake.jitter else 0)
+                if delay:
+                    time.sleep(delay)
+                if roll < fake.failure_rate:
+                    status, kind, body = fake.failure_status, 'text/plain', b'Injected failure'
+                elif roll < fake.failure_rate + fake.html_rate:
+                    status, kind, body = 200, 'text/html', b'<html><body>Service unavailable</body></html>'
+                else:
+                    try:
+                        data = json.loads(raw) if raw else {}
+                    except ValueError:
+                        data = {}
+                    status, kind, body = fake.respond(self.command, path, parse_qs(query), data)
+                if status != 200 or kind != 'application/json':
+                    with fake._lock:
+                        fake.failures[path] += 1
+                self.send_response(status)
+                self.send_header('Content-Type', kind)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            do_GET = do_POST = _send
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a fake Compass API locally")
+    parser.add_argument('--port', type=int, default=8123)
+    parser.add_argument('--latency', type=float, default=0.0, help="Seconds added to every response")
+    parser.add_argument('--jitter', type=float, default=0.0, help="Up to this many extra random seconds")
+    parser.add_argument('--staff', type=int, default=200)
+    parser.add_argument('--locations', type=int, default=100)
+    parser.add_argument('--lessons', type=int, default=6, help="Lessons per day")
+    parser.add_argument('--tasks', type=int, default=50)
+    parser.add_argument('--pad', type=int, default=0, help="Extra bytes per row")
+    parser.add_argument('--failure-rate', type=float, default=0.0)
+    parser.add_argument('--failure-status', type=int, default=500)
+    parser.add_argument('--html-rate', type=float, default=0.0)
+    parser.add_argument('--recorded', help="Directory of recorded responses")
+    args = parser.parse_args()
+
+    fake = FakeCompass(args.port, args.latency, args.jitter, args.staff, args.locations, args.lessons, args.tasks, args.pad,
+                       args.failure_rate, args.failure_status, args.html_rate, args.recorded)
+    print(f"Fake Compass at {fake.url}")
+    try:
+        fake.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        fake.server.server_close()
+        print(dict(fake.stats))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,2 +1,8 @@
-from .errors import *
-from .client import Compass
+from .errors import *
+from .client import Compass
+from .asyncclient import AsyncCompass
+from .cache import CompassCache, CacheStats
+from .clearance import ClearanceStore
+from .metrics import Observer, MetricsRecorder
+from .resilience import SingleFlight, RetryPolicy, CircuitBreaker, RateLimiter
+from .session import ConnectionStats
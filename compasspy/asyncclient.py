@@ -0,0 +1,242 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import AsyncIterator
+from .client import Compass
+from .cache import CompassCache
+from .models import *
+
+
+class AsyncCompass:
+    """
+    asyncio version of Compass
+    Calls run on a small thread pool over the same pooled keep-alive session, so independent
+    endpoints can be fetched at the same time and return the same models as Compass
+    """
+
+    def __init__(self, schoolSubdomain: str, cookie: str, concurrency: int = 4, poolConnections: int = 4, poolMaxsize: int = 10, cache: CompassCache = None, **kwargs):
+        # Other keyword arguments (retry, singleFlight...) are passed to Compass
+        self.client = Compass(schoolSubdomain, cookie, poolConnections=poolConnections, poolMaxsize=max(poolMaxsize, concurrency), cache=cache, **kwargs)
+        self.concurrency = concurrency
+        self._executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='compass')
+
+    @property
+    def user(self) -> Account:
+        return self.client.user
+
+    @property
+    def stats(self):
+        return self.client.stats
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """
+        Close the thread pool and the pooled session
+        """
+        self._executor.shutdown(wait=False)
+        self.client.close()
+
+    async def _run(self, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, partial(func, *args, **kwargs))
+
+    async def gather(self, *calls, limit: int = None, returnExceptions: bool = False) -> list:
+        """
+        Run independent calls at the same time
+        :param calls: Coroutines from this client (Eg. client.getStaff())
+        :param limit: Max calls in flight, defaults to the client concurrency
+        :param returnExceptions: Put exceptions in the result list instead of raising the first one
+        :return: Results in the same order as calls
+        """
+        semaphore = asyncio.Semaphore(limit or self.concurrency)
+
+        async def bounded(call):
+            async with semaphore:
+                return await call
+
+        return await asyncio.gather(*[bounded(c) for c in calls], return_exceptions=returnExceptions)
+
+    def invalidateCache(self, endpoint: str = None):
+        """
+        Drop cached reference data for this school
+        :param endpoint: Only drop this endpoint (Eg. 'User.svc/GetAllStaff')
+        """
+        self.client.invalidateCache(endpoint)
+
+    async def _paginate(self, fetchPage, pageSize: int, prefetch: bool):
+        page = 1
+        pending = asyncio.ensure_future(fetchPage(page, 0, pageSize))
+        try:
+            while pending is not None:
+                current = await pending
+                pending = None
+                if len(current) == pageSize:
+                    pending = fetchPage(page + 1, page * pageSize, pageSize)
+                    if prefetch:
+                        pending = asyncio.ensure_future(pending)
+                    page += 1
+                for item in current:
+                    yield item
+        finally:
+            if isinstance(pending, asyncio.Future):
+                pending.cancel()
+            elif pending is not None:
+                pending.close()
+
+    def iterTasks(self, pageSize: int = 50, prefetch: bool = True, fields: List[str] = None, records: bool = False) -> AsyncIterator[Task]:
+        """
+        Iterate over every task of the user, fetching pages as needed
+        :param pageSize: Tasks per request
+        :param prefetch: Fetch the next page in the background
+        :param fields: Only parse these fields
+        :param records: Return lightweight slotted records (no validation) instead of models
+        :return: AsyncIterator[Task]
+        """
+        return self._paginate(lambda page, start, limit: self.getTasks(page, start, limit, fields, records), pageSize, prefetch)
+
+    def iterTaskCategories(self, pageSize: int = 50, prefetch: bool = True, fields: List[str] = None, records: bool = False) -> AsyncIterator[TaskCategory]:
+        """
+        Iterate over every task category, fetching pages as needed
+        :param pageSize: Categories per request
+        :param prefetch: Fetch the next page in the background
+        :param fields: Only parse these fields
+        :param records: Return lightweight slotted records (no validation) instead of models
+        :return: AsyncIterator[TaskCategory]
+        """
+        return self._paginate(lambda page, start, limit: self.getTaskCategories(page, start, limit, fields, records), pageSize, prefetch)
+
+    def iterLocations(self, pageSize: int = 50, prefetch: bool = True, fields: List[str] = None, records: bool = False) -> AsyncIterator[Location]:
+        """
+        Iterate over every location on Campus, fetching pages as needed
+        :param pageSize: Locations per request
+        :param prefetch: Fetch the next page in the background
+        :param fields: Only parse these fields
+        :param records: Return lightweight slotted records (no validation) instead of models
+        :return: AsyncIterator[Location]
+        """
+        return self._paginate(lambda page, start, limit: self.getLocations(page, start, limit, fields, records), pageSize, prefetch)
+
+    def iterStaff(self, pageSize: int = 50, prefetch: bool = True, fields: List[str] = None, records: bool = False) -> AsyncIterator[User]:
+        """
+        Iterate over every staff member, fetching pages as needed
+        :param pageSize: Staff per request
+        :param prefetch: Fetch the next page in the background
+        :param fields: Only parse these fields
+        :param records: Return lightweight slotted records (no validation) instead of models
+        :return: AsyncIterator[User]
+        """
+        return self._paginate(lambda page, start, limit: self.getStaff(page, start, limit, fields, records), pageSize, prefetch)
+
+    async def login(self) -> bool:
+        """
+        Attempt to login to Compass
+        :return: True if successful, False if not
+        """
+        return await self._run(self.client.login)
+
+    async def getAccount(self) -> Account:
+        """
+        Get the account of the user
+        :return: Account
+        """
+        return await self._run(self.client.getAccount)
+
+    async def saveTask(self, task: str) -> int:
+        """
+        Save a task to the 'My Tasks' section
+        :param task: The task to save
+        :return: The ID of the task
+        """
+        return await self._run(self.client.saveTask, task)
+
+    async def getTasks(self, page: int = 1, start: int = 0, limit: int = 50, fields: List[str] = None, records: bool = False) -> List[Task]:
+        """
+        Get the tasks of the user
+        :param page: Page number
+        :param start: Start number
+        :param limit: Task limit
+        :param fields: Only parse these fields
+        :param records: Return lightweight slotted records (no validation) instead of models
+        :return: List[Task]
+        """
+        return await self._run(self.client.getTasks, page, start, limit, fields, records)
+
+    async def getTaskCategories(self, page: int = 1, start: int = 0, limit: int = 50, fields: List[str] = None, records: bool = False) -> List[TaskCategory]:
+        """
+        Get task categories (Eg. Homework, Assessment)
+        :param page: Page number
+        :param start: Start number
+        :param limit: Task limit
+        :param fields: Only parse these fields
+        :param records: Return lightweight slotted records (no validation) instead of models
+        :return: List[TaskCategory]
+        """
+        return await self._run(self.client.getTaskCategories, page, start, limit, fields, records)
+
+    async def getUpcoming(self, fields: List[str] = None, records: bool = False) -> List[AlertItem]:
+        """
+        Get upcoming events
+        :param fields: Only parse these fields
+        :param records: Return lightweight slotted records (no validation) instead of models
+        :return: List[AlertItem]
+        """
+        return await self._run(self.client.getUpcoming, fields, records)
+
+    async def getLocations(self, page: int = 1, start: int = 0, limit: int = 50, fields: List[str] = None, records: bool = False) -> List[Location]:
+        """
+        Get all buildings on Campus
+        :param page: Page number
+        :param start: Start number
+        :param limit: Location limit
+        :param fields: Only parse these fields
+        :param records: Return lightweight slotted records (no validation) instead of models
+        :return: List[Location]
+        """
+        return await self._run(self.client.getLocations, page, start, limit, fields, records)
+
+    async def getInfo(self, targetUserId: int = None) -> UserDetailsBlob:
+        """
+        Get user info
+        :param targetUserId: The optional user ID of the target user
+        :return: UserDetailsBlob
+        """
+        return await self._run(self.client.getInfo, targetUserId)
+
+    async def getTimetable(self, dt: str = None) -> GenericMobileResponse:
+        """
+        Get the timetable of the user
+        :param dt: The date to get the timetable for
+        :return: GenericMobileResponse
+        """
+        return await self._run(self.client.getTimetable, dt)
+
+    async def getTimetableRange(self, start, end, skipWeekends: bool = False, holidays: list = None, maxWorkers: int = 8, allowPartial: bool = True, raw: bool = False) -> TimetableRange:
+        """
+        Get the timetable for every date from start to end (inclusive)
+        :param start: First date (date or dd/mm/YYYY)
+        :param end: Last date (date or dd/mm/YYYY)
+        :param skipWeekends: Don't fetch Saturdays and Sundays
+        :param holidays: Dates to skip (date or dd/mm/YYYY)
+        :param maxWorkers: Max timetable requests in flight
+        :param allowPartial: Keep the dates that worked and record failures in .errors instead of raising
+        :param raw: Keep each day's x['d'] dict instead of parsing it into a model
+        :return: TimetableRange
+        """
+        return await self._run(self.client.getTimetableRange, start, end, skipWeekends, holidays, maxWorkers, allowPartial, raw)
+
+    async def getStaff(self, page: int = 1, start: int = 0, limit: int = 50, fields: List[str] = None, records: bool = False) -> List[User]:
+        """
+        Get All Staff Members
+        :param page: Page number
+        :param start: Start number
+        :param limit: Return limit
+        :param fields: Only parse these fields
+        :param records: Return lightweight slotted records (no validation) instead of models
+        :return: List[User]
+        """
+        return await self._run(self.client.getStaff, page, start, limit, fields, records)
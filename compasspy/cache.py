@@ -0,0 +1,159 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import logging
+
+
+class CacheStats:
+    """Hit / miss counters for a CompassCache"""
+
+    def __init__(self):
+        self.hits = 0  # Fresh entry served
+        self.staleHits = 0  # Expired entry served while a refresh runs in the background
+        self.misses = 0  # Nothing stored, caller waited on the network
+        self.refreshes = 0  # Background refreshes that stored a new entry
+        self.refreshErrors = 0
+        self._lock = threading.Lock()  # Background refreshes count from their own threads
+
+    def add(self, counter: str):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    @property
+    def hitRatio(self) -> float:
+        total = self.hits + self.staleHits + self.misses
+        return (self.hits + self.staleHits) / total if total else 0.0
+
+    def asDict(self) -> dict:
+        return {'hits': self.hits, 'staleHits': self.staleHits, 'misses': self.misses,
+                'refreshes': self.refreshes, 'refreshErrors': self.refreshErrors, 'hitRatio': self.hitRatio}
+
+    def __repr__(self):
+        return f'CacheStats(hits={self.hits}, staleHits={self.staleHits}, misses={self.misses}, refreshes={self.refreshes})'
+
+
+class CompassCache:
+    """
+    Disk-backed TTL cache for Compass reference data (staff, locations...)
+    Entries live in a local sqlite file so they survive restarts. Expired entries are served straight
+    away while a background thread fetches a fresh copy (stale-while-revalidate)
+    """
+
+    # Seconds an entry stays fresh, per endpoint. Endpoints not listed here are never cached
+    DEFAULT_TTLS = {
+        'User.svc/GetAllStaff': 7 * 24 * 3600,
+        'ReferenceDataCache.svc/GetAllLocations': 7 * 24 * 3600,
+        'LearningTasks.svc/GetAllTaskCategories': 24 * 3600
+    }
+
+    def __init__(self, path: str = None, ttls: dict = None, staleWhileRevalidate: bool = True, maxStale: float = None):
+        """
+        :param path: sqlite file to store entries in (Default: ~/.compasspy/cache.sqlite3)
+        :param ttls: Per-endpoint TTLs in seconds, merged over DEFAULT_TTLS
+        :param staleWhileRevalidate: Serve expired entries while refreshing in the background
+        :param maxStale: Seconds past expiry after which an entry is treated as a miss (None = no limit)
+        """
+        if path is None:
+            path = os.path.join(os.path.expanduser('~'), '.compasspy', 'cache.sqlite3')
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.ttls = dict(self.DEFAULT_TTLS)
+        self.ttls.update(ttls or {})
+        self.staleWhileRevalidate = staleWhileRevalidate
+        self.maxStale = maxStale
+        self.stats = CacheStats()
+
+        self._lock = threading.Lock()
+        self._refreshing = set()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute('CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, endpoint TEXT, storedAt REAL, value TEXT)')
+        self._db.commit()
+
+    def caches(self, endpoint: str) -> bool:
+        return endpoint in self.ttls
+
+    def get(self, key: str):
+        """
+        Read an entry regardless of age
+        :param key: Cache key
+        :return: (value, storedAt) or None
+        """
+        with self._lock:
+            row = self._db.execute('SELECT value, storedAt FROM entries WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0]), row[1]
+
+    def set(self, endpoint: str, key: str, value):
+        with self._lock:
+            self._db.execute('INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?)', (key, endpoint, time.time(), json.dumps(value)))
+            self._db.commit()
+
+    def fetch(self, endpoint: str, key: str, loader):
+        """
+        Get an entry, calling loader() on a miss and refreshing expired entries in the background
+        :param endpoint: Endpoint the entry belongs to (picks the TTL)
+        :param key: Cache key
+        :param loader: Callable returning the fresh value, raising for anything that shouldn't be stored (it's not cached)
+        :return: The cached or freshly loaded value
+        """
+        ttl = self.ttls[endpoint]
+        entry = self.get(key)
+        if entry is not None:
+            value, storedAt = entry
+            age = time.time() - storedAt
+            if age < ttl:
+                self.stats.add('hits')
+                return value
+            if self.staleWhileRevalidate and (self.maxStale is None or age < ttl + self.maxStale):
+                self.stats.add('staleHits')
+                self._refreshInBackground(endpoint, key, loader)
+                return value
+        self.stats.add('misses')
+        value = loader()
+        self.set(endpoint, key, value)
+        return value
+
+    def _refreshInBackground(self, endpoint: str, key: str, loader):
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def refresh():
+            try:
+                self.set(endpoint, key, loader())
+                self.stats.add('refreshes')
+            except Exception as e:
+                self.stats.add('refreshErrors')
+                logging.warning(f'Compass - Cache refresh failed for {key}: {e}')
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=refresh, name='compass-cache-refresh', daemon=True).start()
+
+    def invalidate(self, endpoint: str = None, key: str = None, prefix: str = None):
+        """
+        Drop cached entries, everything if no filter is given
+        :param endpoint: Only drop entries for this endpoint
+        :param key: Only drop this key
+        :param prefix: Only drop keys starting with this (Eg. a school subdomain)
+        """
+        with self._lock:
+            if key is not None:
+                self._db.execute('DELETE FROM entries WHERE key = ?', (key,))
+            elif prefix is not None:
+                self._db.execute('DELETE FROM entries WHERE substr(key, 1, ?) = ?', (len(prefix), prefix))
+            elif endpoint is not None:
+                self._db.execute('DELETE FROM entries WHERE endpoint = ?', (endpoint,))
+            else:
+                self._db.execute('DELETE FROM entries')
+            self._db.commit()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
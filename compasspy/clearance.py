@@ -0,0 +1,196 @@
+import json
+import os
+import tempfile
+import threading
+import time
+import logging
+from contextlib import contextmanager
+import cloudscraper
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+@contextmanager
+def _fileLock(path: str):
+    # Every process (Eg. each fetch worker) read-modify-writes the same store, the thread lock only covers one
+    with open(path + '.lock', 'a') as f:
+        if fcntl:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        else:
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class ClearanceStore:
+    """
+    Saves Cloudflare clearance cookies per school subdomain so new sessions (and new runs)
+    can reuse a solved challenge instead of solving it again
+    """
+
+    # Cookies Cloudflare uses to remember a browser that passed the challenge
+    COOKIES = ('cf_clearance', '__cf_bm', '__cflb', '_cfuvid')
+
+    def __init__(self, path: str = None, refreshBefore: float = 300.0):
+        """
+        :param path: JSON file to store clearances in (Default: ~/.compasspy/clearance.json)
+        :param refreshBefore: Seconds before expiry to solve a fresh challenge in the background
+        """
+        if path is None:
+            path = os.path.join(os.path.expanduser('~'), '.compasspy', 'clearance.json')
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.refreshBefore = refreshBefore
+        self._lock = threading.Lock()
+
+    def _read(self) -> dict:
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write(self, data: dict):
+        with tempfile.NamedTemporaryFile('w', dir=os.path.dirname(self.path) or '.', prefix=os.path.basename(self.path),
+                                         suffix='.tmp', delete=False) as f:
+            json.dump(data, f)
+        try:
+            os.replace(f.name, self.path)
+        except OSError:
+            os.remove(f.name)
+            raise
+
+    @classmethod
+    def fingerprint(cls, session) -> tuple:
+        """Values of the clearance cookies currently in a session, to tell when they change"""
+        return tuple(sorted((c.name, c.domain, c.value) for c in session.cookies if c.name in cls.COOKIES))
+
+    def load(self, subdomain: str) -> dict:
+        """
+        Get the stored clearance for a school if it hasn't expired
+        :param subdomain: School subdomain
+        :return: {'cookies': [...], 'userAgent': str, 'expires': float} or None
+        """
+        with self._lock:
+            entry = self._read().get(subdomain)
+        if entry is None or entry['expires'] <= time.time():
+            return None
+        return entry
+
+    def save(self, subdomain: str, session, userAgent: str):
+        """
+        Store the clearance cookies of a session
+        :param subdomain: School subdomain
+        :param session: requests / cloudscraper session
+        :param userAgent: User-Agent the cookies were issued to (Cloudflare binds clearance to it)
+        """
+        cookies = [{'name': c.name, 'value': c.value, 'domain': c.domain, 'path': c.path, 'expires': c.expires, 'secure': c.secure}
+                   for c in session.cookies if c.name in self.COOKIES]
+        if not cookies:
+            return
+        # Only cf_clearance decides, the others (Eg. __cf_bm, ~30 minutes) are reissued on the next response anyway
+        expiring = [c['expires'] for c in cookies if c['name'] == 'cf_clearance' and c['expires']]
+        with self._lock, _fileLock(self.path):
+            data = self._read()
+            data[subdomain] = {'cookies': cookies, 'userAgent': userAgent, 'expires': min(expiring) if expiring else time.time() + 1800}
+            self._write(data)
+
+    def apply(self, subdomain: str, session, userAgent: str) -> float:
+        """
+        Load a stored clearance into a session
+        :param subdomain: School subdomain
+        :param session: requests / cloudscraper session
+        :param userAgent: User-Agent the session sends, must match the stored one
+        :return: When the clearance expires (unix time), or None if nothing usable was stored
+        """
+        entry = self.load(subdomain)
+        if entry is None or entry['userAgent'] != userAgent:
+            return None
+        for c in entry['cookies']:
+            session.cookies.set(c['name'], c['value'], domain=c['domain'], path=c['path'], expires=c['expires'], secure=c['secure'])
+        return entry['expires']
+
+    def invalidate(self, subdomain: str = None):
+        """
+        Forget stored clearances
+        :param subdomain: Only forget this school
+        """
+        with self._lock, _fileLock(self.path):
+            data = self._read()
+            if subdomain is None:
+                data = {}
+            else:
+                data.pop(subdomain, None)
+            self._write(data)
+
+
+class ClearanceKeeper:
+    """Keeps one client's clearance saved and refreshes it in the background before it expires"""
+
+    def __init__(self, store: ClearanceStore, client):
+        self.store = store
+        self.client = client
+        self._saved = None
+        self._timer = None
+        self._closed = False
+        self.restoredExpiry = store.apply(client.schoolSubdomain, client.session, client.headers['User-Agent'])
+        self._saved = ClearanceStore.fingerprint(client.session)
+        if self.restoredExpiry:
+            self._schedule(self.restoredExpiry)
+
+    def check(self):
+        """Save the clearance if the session picked up new cookies (Eg. after solving a challenge)"""
+        fingerprint = ClearanceStore.fingerprint(self.client.session)
+        if fingerprint != self._saved:
+            self._saved = fingerprint
+            self.store.save(self.client.schoolSubdomain, self.client.session, self.client.headers['User-Agent'])
+            entry = self.store.load(self.client.schoolSubdomain)
+            if entry:
+                self._schedule(entry['expires'])
+
+    def _schedule(self, expires: float):
+        if self._closed:
+            return
+        if self._timer:
+            self._timer.cancel()
+        self._timer = threading.Timer(max(60.0, expires - self.store.refreshBefore - time.time()), self.refresh)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def refresh(self):
+        """Drop the expiring clearance and solve a new challenge now, rather than during the next call"""
+        # Other threads keep sending on the session meanwhile, so the challenge is solved on a separate scraper with a
+        # copy of the cookies, and the session only gets the new jar (in one assignment) once there's a clearance in it
+        session = self.client.session
+        jar = session.cookies.copy()
+        for c in [c for c in jar if c.name == 'cf_clearance']:
+            jar.clear(c.domain, c.path, c.name)
+        probe = cloudscraper.create_scraper()
+        probe.headers.update(session.headers)
+        probe.cookies = jar
+        try:
+            probe.get(self.client.API_ENDPOINT.replace('/Services/', '/'), headers=self.client.headers, timeout=60)
+        except Exception as e:
+            logging.warning(f'Compass - Clearance refresh failed: {e}')
+        finally:
+            probe.close()
+        if any(c.name == 'cf_clearance' for c in jar):
+            session.cookies = jar
+        # Otherwise no new challenge was issued (or solving failed), the old clearance is used until it expires
+        self.check()
+
+    def close(self):
+        self._closed = True
+        if self._timer:
+            self._timer.cancel()
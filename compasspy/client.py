@@ -1,179 +1,545 @@
-import logging
-from datetime import datetime, date
-import cloudscraper  
-from .models import *
-
-class Compass:
-    def __init__(self, schoolSubdomain: str, cookie: str, login: bool = False):
-        # API Endpoint Stuffs
-        self.API_ENDPOINT = f'https://{schoolSubdomain}.compass.education/Services/'
-        self.headers = {
-            "Accept": "*/*", 
-            "Content-Type": "application/json", 
-            "Accept-Encoding": "gzip, deflate", 
-            "User-Agent": "iOS/14_6_0 type/iPhone CompassEducation/6.3.0", 
-            "Accept-Language": "en-au", 
-            "Connection": "close"
-        } 
-        self.cookies = {"ASP.NET_SessionId": cookie}
-
-        self.schoolSubdomain = schoolSubdomain
-        self.userId = ''
-        self.cookie = cookie
-        self.dt = {'userId': None, 'cookie': cookie, 'subdomain': schoolSubdomain}
-        self.user = None
-
-        if login:
-            self.login()
-
-    def getAccount(self) -> Account:
-        """
-        Get the account of the user
-        :return: Account
-        """
-        d = self.dt
-        scraper = cloudscraper.create_scraper()  # Create scraper instance
-        x = scraper.post(self.API_ENDPOINT + 'Accounts.svc/GetAccount', headers=self.headers, cookies=self.cookies)
-        try:
-            x = x.json()
-        except Exception as e:
-            raise APIError(x.text)
-        return Account.parse_obj(x['d'])
-
-    def saveTask(self, task: str) -> int:
-        """
-        Save a task to the 'My Tasks' section
-        :param task: The task to save
-        :return: The ID of the task
-        """
-        data = {"sessionstate": "readonly", "userId": int(self.dt['userId']), "task": {"id": 0, "taskName": task, "status": False}}
-        scraper = cloudscraper.create_scraper()
-        x = scraper.post(self.API_ENDPOINT + 'TaskService.svc/SaveTaskItem', headers=self.headers, cookies=self.cookies, json=data).json()['d']
-        return x
-
-    def getTasks(self, page: int = 1, start: int = 0, limit: int = 50) -> List[Task]:
-        """
-        Get the tasks of the user
-        :param page: Page number
-        :param start: Start number
-        :param limit: Task limit
-        :return: List[Task]
-        """
-        data = {"sessionstate": "readonly", "userId": int(self.dt['userId']), "page": page, "start": start, "limit": limit}
-        scraper = cloudscraper.create_scraper()
-        x = scraper.post(self.API_ENDPOINT + 'TaskService.svc/GetTaskItems', headers=self.headers, cookies=self.cookies, json=data).json()
-        a = []
-        for f in x['d']:
-            a += [Task.parse_obj(f)]
-        return a
-
-    def getTaskCategories(self, page: int = 1, start: int = 0, limit: int = 50) -> List[TaskCategory]:
-        """
-        Get task categories (Eg. Homework, Assessment)
-        :param page: Page number
-        :param start: Start number
-        :param limit: Task limit
-        :return: List[TaskCategory]
-        """
-        data = {"sessionstate": "readonly", "page": page, "start": start, "limit": limit}
-        scraper = cloudscraper.create_scraper()
-        x = scraper.post(self.API_ENDPOINT + 'LearningTasks.svc/GetAllTaskCategories', headers=self.headers, cookies=self.cookies, json=data).json()
-        a = []
-        for f in x['d']:
-            a += [TaskCategory.parse_obj(f)]
-        return a
-
-    def getUpcoming(self) -> List[AlertItem]:
-        """
-        Get upcoming events
-        :return: List[AlertItem]
-        """
-        data = {"sessionstate": "readonly", "userId": int(self.dt['userId']), "targetUserId": int(self.dt['userId'])}
-        scraper = cloudscraper.create_scraper()
-        x = scraper.post(self.API_ENDPOINT + 'NewsFeed.svc/GetMyUpcoming', headers=self.headers, cookies=self.cookies, json=data).json()
-        a = []
-        for f in x['d']:
-            a += [AlertItem.parse_obj(f)]
-        return a
-
-    def getLocations(self, page: int = 1, start: int = 0, limit: int = 50) -> List[Location]:
-        """
-        Get all buildings on Campus
-        :param page: Page number
-        :param start: Start number
-        :param limit: Location limit
-        :return:
-        """
-        scraper = cloudscraper.create_scraper()
-        x = scraper.get(self.API_ENDPOINT + f'ReferenceDataCache.svc/GetAllLocations?sessionstate=readonly&page={page}&start={start}&limit={limit}', headers=self.headers, cookies=self.cookies).json()
-        a = []
-        for f in x['d']:
-            a += [Location.parse_obj(f)]
-        return a
-
-    def getInfo(self, targetUserId: int = None) -> UserDetailsBlob:
-        """
-        Get user info
-        :param targetUserId: The optional user ID of the target user
-        :return: UserDetailsBlob
-        """
-        if targetUserId == None:
-            targetUserId = self.dt['userId']
-        data = {"sessionstate": "readonly", "userId": int(self.dt['userId']), "targetUserId": int(targetUserId)}
-        scraper = cloudscraper.create_scraper()
-        x = scraper.post(self.API_ENDPOINT + 'User.svc/GetUserDetailsBlobByUserId', headers=self.headers, cookies=self.cookies, json=data).json()
-        return UserDetailsBlob.parse_obj(x['d'])
-
-    def getTimetable(self, dt: str = None) -> GenericMobileResponse:
-        """
-        Get the timetable of the user
-        :param dt: The date to get the timetable for
-        :return: GenericMobileResponse
-        """
-        if dt == None:
-            da = date.today().strftime(f"%d/%m/%Y")
-        else:
-            da = datetime.strptime(str(dt), f"%d/%m/%Y").strftime(f"%d/%m/%Y")
-        data = {"date": f"{da} - 12:00 am", "sessionstate": "readonly", "userId": int(self.dt['userId'])}
-        scraper = cloudscraper.create_scraper()
-        x = scraper.post(self.API_ENDPOINT + 'mobile.svc/GetScheduleLinesForDate', headers=self.headers, cookies=self.cookies, json=data).json()
-        return (x)
-    
-    def getStaff(self, page: int = 1, start: int = 0, limit: int = 50) -> List[User]:
-        """
-        Get All Staff Members
-        :param page: Page number
-        :param start: Start number
-        :param limit: Return limit
-        :return: List[User]
-        """
-        data = {"sessionstate": "readonly", "userId": int(self.dt['userId']), "page": page, "start": start, "limit": limit}
-        scraper = cloudscraper.create_scraper()
-        x = scraper.post(self.API_ENDPOINT+'User.svc/GetAllStaff', headers=self.headers, cookies=self.cookies, json=data).json()
-        a = []
-        for f in x['d']:
-            a += [User.parse_obj(f)]
-        return a
-
-    def login(self) -> bool:
-        """
-        Attempt to login to Compass
-        :return: True if successful, False if not
-        """
-        if not self.user:
-            d = self.dt.copy()
-            scraper = cloudscraper.create_scraper()
-            x = scraper.post(self.API_ENDPOINT + 'Accounts.svc/GetAccount', headers=self.headers, cookies=self.cookies)
-            try:
-                x = x.json()
-            except Exception as e:
-                raise APIError(x.text)
-            if 'h' in x:
-                raise UnauthorisedError(x['h'])
-            self.user = Account.parse_obj(x['d'])
-            self.dt = {'userId': self.user.userId, 'cookie': self.cookie, 'subdomain': self.schoolSubdomain}
-            logging.info('Compass - Logged in', self.user)
-            return True
-        else:
-            logging.warning('Compass - Already logged in')
-            return True
+import json
+import logging
+import time
+import threading
+import requests
+from cloudscraper.exceptions import CloudflareException
+from urllib3.exceptions import NewConnectionError
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, date, timedelta
+from typing import Iterator
+from .models import *
+from .session import ConnectionStats, createSession
+from .cache import CompassCache
+from .stream import iterItems
+from .resilience import SingleFlight, RetryPolicy, CircuitBreaker, RateLimiter
+from .metrics import Observer
+from .clearance import ClearanceStore, ClearanceKeeper
+
+
+def _unsent(error: Exception) -> bool:
+    # True if the request failed while connecting (or at Cloudflare), so Compass never saw it
+    if isinstance(error, (requests.ConnectTimeout, CloudflareException)):
+        return True
+    reason = getattr(error.args[0], 'reason', None) if error.args else None
+    return isinstance(reason, NewConnectionError)
+
+
+class Compass:
+    def __init__(self, schoolSubdomain: str, cookie: str, login: bool = False, poolConnections: int = 4, poolMaxsize: int = 10, cache: CompassCache = None,
+                 retry: RetryPolicy = None, singleFlight: SingleFlight = None, breakerThreshold: int = 5, breakerResetTimeout: float = 30.0,
+                 observers: List[Observer] = None, clearance: ClearanceStore = None, rateLimit: RateLimiter = None, apiEndpoint: str = None):
+        # API Endpoint Stuffs (apiEndpoint points the client somewhere else, Eg. a local fake server)
+        self.API_ENDPOINT = apiEndpoint or f'https://{schoolSubdomain}.compass.education/Services/'
+        self.headers = {
+            "Accept": "*/*", 
+            "Content-Type": "application/json", 
+            "Accept-Encoding": "gzip, deflate", 
+            "User-Agent": "iOS/14_6_0 type/iPhone CompassEducation/6.3.0", 
+            "Accept-Language": "en-au", 
+            "Connection": "keep-alive"
+        } 
+        self.cookies = {"ASP.NET_SessionId": cookie}
+
+        self.schoolSubdomain = schoolSubdomain
+        self.userId = ''
+        self.cookie = cookie
+        self.dt = {'userId': None, 'cookie': cookie, 'subdomain': schoolSubdomain}
+        self.user = None
+
+        # One keep-alive session shared by every call
+        self.stats = ConnectionStats()
+        self.session = createSession(self.stats, poolConnections, poolMaxsize)
+        self.cache = cache
+
+        # Failure handling, identical concurrent calls share one request (pass the same SingleFlight to share across clients)
+        self.retry = retry or RetryPolicy()
+        self.singleFlight = singleFlight or SingleFlight()
+        self.breakerThreshold = breakerThreshold
+        self.breakerResetTimeout = breakerResetTimeout
+        self.breakers = {}
+        self._breakersLock = threading.Lock()
+
+        # Instrumentation hooks (Eg. metrics.MetricsRecorder)
+        self.observers = list(observers or [])
+
+        # Reuse a saved Cloudflare clearance for this school instead of solving the challenge again
+        self.clearance = ClearanceKeeper(clearance, self) if clearance else None
+
+        # Upstream request rate limit (pass the same RateLimiter to clients of one school to share it)
+        self.rateLimit = rateLimit
+
+        if login:
+            self.login()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """
+        Close the pooled session and its open connections
+        """
+        if self.clearance:
+            self.clearance.close()
+        self.session.close()
+
+    def _request(self, method: str, path: str, data: dict = None, **kwargs):
+        if self.rateLimit:
+            self.rateLimit.acquire()
+        x = self.session.request(method, self.API_ENDPOINT + path, headers=self.headers, cookies=self.cookies, json=data, **kwargs)
+        if self.clearance:
+            self.clearance.check()
+        return x
+
+    def _breaker(self, endpoint: str) -> CircuitBreaker:
+        with self._breakersLock:
+            if endpoint not in self.breakers:
+                self.breakers[endpoint] = CircuitBreaker(endpoint, self.breakerThreshold, self.breakerResetTimeout)
+            return self.breakers[endpoint]
+
+    def _json(self, method: str, path: str, data: dict = None, write: bool = False) -> dict:
+        if write:
+            # Every save has to reach Compass, coalescing identical ones would drop all but the first
+            return self._fetchJson(method, path, data, write=True)
+        key = (self.API_ENDPOINT, self.cookie, method, path, json.dumps(data, sort_keys=True))
+        return self.singleFlight.do(key, lambda: self._fetchJson(method, path, data))
+
+    def addObserver(self, observer: Observer):
+        """
+        Add an instrumentation hook
+        :param observer: metrics.Observer (Eg. metrics.MetricsRecorder())
+        """
+        self.observers.append(observer)
+
+    def _emit(self, hook: str, *args):
+        for observer in self.observers:
+            try:
+                getattr(observer, hook)(*args)
+            except Exception as e:
+                logging.warning(f'Compass - Observer {observer!r}.{hook} failed: {e}')
+
+    def _parse(self, endpoint: str, parse, *args):
+        start = time.perf_counter()
+        result = parse(*args)
+        self._emit('onParse', endpoint, time.perf_counter() - start, len(result) if isinstance(result, list) else 1)
+        return result
+
+    def _send(self, endpoint: str, method: str, path: str, data: dict = None, stream: bool = False, write: bool = False):
+        # One request through the circuit breaker and retry policy, connection failures / 429 / 5xx are retried
+        # (writes only when the request never went out, Compass may have acted on it otherwise)
+        # Returns (response, perf_counter at the start of the attempt that worked)
+        breaker = self._breaker(endpoint)
+        breaker.before()
+        attempt = 1
+        while True:
+            try:
+                start = time.perf_counter()
+                retry = not write
+                try:
+                    x = self._request(method, path, data, stream=stream)
+                    failed = x.status_code == 429 or x.status_code >= 500
+                    if failed or not stream:
+                        # Streamed bodies are reported by _stream once they have been read
+                        self._emit('onRequest', endpoint, time.perf_counter() - start, len(x.content), x.status_code)
+                except (requests.ConnectionError, requests.Timeout, CloudflareException) as e:
+                    retry = retry or _unsent(e)
+                    raise RequestFailed(f'{type(e).__name__}: {e}') from e
+                except requests.RequestException as e:
+                    # Broken bodies, redirect loops, ... callers only see this library's errors
+                    raise APIError(f'{type(e).__name__}: {e}') from e
+                if failed:
+                    raise RequestFailed(f'HTTP {x.status_code}: {x.text[:500]}')
+            except RequestFailed as e:
+                if retry and attempt < self.retry.attempts:
+                    self._emit('onRetry', endpoint, attempt, e)
+                    time.sleep(self.retry.delay(attempt))
+                    attempt += 1
+                    continue
+                breaker.failure()
+                raise
+            except BaseException:
+                # Anything else still settles the breaker, a half-open trial call would otherwise never end
+                breaker.failure()
+                raise
+            breaker.success()  # Compass answered, even if it's not with JSON
+            return x, start
+
+    def _fetchJson(self, method: str, path: str, data: dict = None, write: bool = False) -> dict:
+        endpoint = path.split('?')[0]
+        try:
+            x, _ = self._send(endpoint, method, path, data, write=write)
+            try:
+                return x.json()
+            except ValueError:
+                raise APIError(x.text)
+        except Exception as e:
+            self._emit('onError', endpoint, e)
+            raise
+
+    def _stream(self, method: str, path: str, data: dict = None, parse=None, chunkSize: int = 64 * 1024) -> Iterator:
+        # Yields the rows of x['d'] (through parse) as they are decoded, instead of loading the whole body
+        # The request goes through the same breaker / retries / observers as _fetchJson. onRequest is reported when
+        # the generator ends, with the time spent reading and decoding (not the time the caller spent on rows)
+        endpoint = path.split('?')[0]
+        try:
+            x, start = self._send(endpoint, method, path, data, stream=True)
+        except Exception as e:
+            self._emit('onError', endpoint, e)
+            raise
+        head = []
+        nbytes = 0
+        rows = 0
+        parseSeconds = 0.0
+        callerSeconds = 0.0
+        started = False
+
+        def chunks():
+            nonlocal nbytes
+            for chunk in x.iter_content(chunkSize):
+                nbytes += len(chunk)
+                if not started and len(head) < 16:
+                    head.append(chunk)
+                yield chunk
+        try:
+            items = iterItems(chunks())
+            while True:
+                try:
+                    row = next(items)
+                except StopIteration:
+                    break
+                except ValueError:
+                    if started:
+                        raise APIError('Compass response ended early or is not valid JSON')
+                    # Nothing decoded yet, so it's likely an error page: report the body like _json does
+                    raise APIError((b''.join(head) + x.raw.read(decode_content=True)).decode(errors='replace'))
+                except requests.RequestException as e:
+                    raise APIError(f'{type(e).__name__}: {e}') from e  # Body cut off / undecodable mid-stream
+                started = True
+                rows += 1
+                if parse is not None:
+                    parsing = time.perf_counter()
+                    row = parse(row)
+                    parseSeconds += time.perf_counter() - parsing
+                waiting = time.perf_counter()
+                yield row
+                callerSeconds += time.perf_counter() - waiting
+        except Exception as e:
+            self._emit('onError', endpoint, e)
+            raise
+        finally:
+            x.close()
+            # Also when the body broke or the caller stopped early (break / close()), for what was read
+            self._emit('onRequest', endpoint, time.perf_counter() - start - callerSeconds - parseSeconds, nbytes, x.status_code)
+            if parse is not None:
+                self._emit('onParse', endpoint, parseSeconds, rows)
+
+    def _cached(self, endpoint: str, params: str, loader) -> dict:
+        if self.cache is None or not self.cache.caches(endpoint):
+            return loader()
+
+        def load():
+            # Only real answers are stored, an error body would otherwise be served for the whole TTL
+            x = loader()
+            if 'd' not in x:
+                if 'h' in x:
+                    raise UnauthorisedError(x['h'])
+                raise APIError(json.dumps(x)[:500])
+            return x
+        return self.cache.fetch(endpoint, f'{self.schoolSubdomain}/{endpoint}?{params}', load)
+
+    def invalidateCache(self, endpoint: str = None):
+        """
+        Drop cached reference data for this school
+        :param endpoint: Only drop this endpoint (Eg. 'User.svc/GetAllStaff')
+        """
+        if self.cache is not None:
+            self.cache.invalidate(prefix=f'{self.schoolSubdomain}/{endpoint}?' if endpoint else f'{self.schoolSubdomain}/')
+
+    def getAccount(self) -> Account:
+        """
+        Get the account of the user
+        :return: Account
+        """
+        x = self._json('POST', 'Accounts.svc/GetAccount')
+        return self._parse('Accounts.svc/GetAccount', Account.parse_obj, x['d'])
+
+    def saveTask(self, task: str) -> int:
+        """
+        Save a task to the 'My Tasks' section
+        :param task: The task to save
+        :return: The ID of the task
+        """
+        data = {"sessionstate": "readonly", "userId": int(self.dt['userId']), "task": {"id": 0, "taskName": task, "status": False}}
+        x = self._json('POST', 'TaskService.svc/SaveTaskItem', data, write=True)['d']
+        return x
+
+    def getTasks(self, page: int = 1, start: int = 0, limit: int = 50, fields: List[str] = None, records: bool = False) -> List[Task]:
+        """
+        Get the tasks of the user
+        :param page: Page number
+        :param start: Start number
+        :param limit: Task limit
+        :param fields: Only parse these fields
+        :param records: Return lightweight slotted records (no validation) instead of models
+        :return: List[Task]
+        """
+        data = {"sessionstate": "readonly", "userId": int(self.dt['userId']), "page": page, "start": start, "limit": limit}
+        x = self._json('POST', 'TaskService.svc/GetTaskItems', data)
+        return self._parse('TaskService.svc/GetTaskItems', parseList, Task, x['d'], fields, records)
+
+    def getTaskCategories(self, page: int = 1, start: int = 0, limit: int = 50, fields: List[str] = None, records: bool = False) -> List[TaskCategory]:
+        """
+        Get task categories (Eg. Homework, Assessment)
+        :param page: Page number
+        :param start: Start number
+        :param limit: Task limit
+        :param fields: Only parse these fields
+        :param records: Return lightweight slotted records (no validation) instead of models
+        :return: List[TaskCategory]
+        """
+        data = {"sessionstate": "readonly", "page": page, "start": start, "limit": limit}
+        x = self._cached('LearningTasks.svc/GetAllTaskCategories', f'{page}:{start}:{limit}', lambda: self._json('POST', 'LearningTasks.svc/GetAllTaskCategories', data))
+        return self._parse('LearningTasks.svc/GetAllTaskCategories', parseList, TaskCategory, x['d'], fields, records)
+
+    def getUpcoming(self, fields: List[str] = None, records: bool = False) -> List[AlertItem]:
+        """
+        Get upcoming events
+        :param fields: Only parse these fields
+        :param records: Return lightweight slotted records (no validation) instead of models
+        :return: List[AlertItem]
+        """
+        data = {"sessionstate": "readonly", "userId": int(self.dt['userId']), "targetUserId": int(self.dt['userId'])}
+        x = self._json('POST', 'NewsFeed.svc/GetMyUpcoming', data)
+        return self._parse('NewsFeed.svc/GetMyUpcoming', parseList, AlertItem, x['d'], fields, records)
+
+    def getLocations(self, page: int = 1, start: int = 0, limit: int = 50, fields: List[str] = None, records: bool = False) -> List[Location]:
+        """
+        Get all buildings on Campus
+        :param page: Page number
+        :param start: Start number
+        :param limit: Location limit
+        :param fields: Only parse these fields
+        :param records: Return lightweight slotted records (no validation) instead of models
+        :return: List[Location]
+        """
+        x = self._cached('ReferenceDataCache.svc/GetAllLocations', f'{page}:{start}:{limit}', lambda: self._json('GET', f'ReferenceDataCache.svc/GetAllLocations?sessionstate=readonly&page={page}&start={start}&limit={limit}'))
+        return self._parse('ReferenceDataCache.svc/GetAllLocations', parseList, Location, x['d'], fields, records)
+
+    def getInfo(self, targetUserId: int = None) -> UserDetailsBlob:
+        """
+        Get user info
+        :param targetUserId: The optional user ID of the target user
+        :return: UserDetailsBlob
+        """
+        if targetUserId == None:
+            targetUserId = self.dt['userId']
+        data = {"sessionstate": "readonly", "userId": int(self.dt['userId']), "targetUserId": int(targetUserId)}
+        x = self._json('POST', 'User.svc/GetUserDetailsBlobByUserId', data)
+        return self._parse('User.svc/GetUserDetailsBlobByUserId', UserDetailsBlob.parse_obj, x['d'])
+
+    def getTimetable(self, dt: str = None) -> GenericMobileResponse:
+        """
+        Get the timetable of the user
+        :param dt: The date to get the timetable for
+        :return: GenericMobileResponse
+        """
+        if dt == None:
+            da = date.today().strftime("%d/%m/%Y")
+        else:
+            da = datetime.strptime(str(dt), "%d/%m/%Y").strftime("%d/%m/%Y")
+        data = {"date": f"{da} - 12:00 am", "sessionstate": "readonly", "userId": int(self.dt['userId'])}
+        x = self._json('POST', 'mobile.svc/GetScheduleLinesForDate', data)
+        return (x)
+
+    @staticmethod
+    def _toDate(dt) -> date:
+        if isinstance(dt, datetime):
+            return dt.date()
+        if isinstance(dt, date):
+            return dt
+        return datetime.strptime(str(dt), "%d/%m/%Y").date()
+
+    def getTimetables(self, dates: list, maxWorkers: int = 8, allowPartial: bool = True, raw: bool = False) -> TimetableRange:
+        """
+        Get the timetables for a list of dates, fetched in parallel
+        :param dates: Dates to fetch (date or dd/mm/YYYY), duplicates are only fetched once
+        :param maxWorkers: Max timetable requests in flight
+        :param allowPartial: Keep the dates that worked and record failures in .errors instead of raising
+        :param raw: Keep each day's x['d'] dict (Eg. for lessons.normalize_lessons) instead of parsing it into a model
+        :return: TimetableRange
+        """
+        days = sorted(set(self._toDate(d) for d in dates))
+        result = TimetableRange(days={}, errors={})
+        if not days:
+            return result
+        with ThreadPoolExecutor(max_workers=min(maxWorkers, len(days)), thread_name_prefix='compass-timetable') as pool:
+            futures = {pool.submit(self.getTimetable, d.strftime("%d/%m/%Y")): d for d in days}
+            for future in as_completed(futures):
+                d = futures[future]
+                try:
+                    x = future.result()['d']
+                    result.days[d] = x if raw else self._parse('mobile.svc/GetScheduleLinesForDate', GenericMobileResponse.parse_obj, x)
+                except Exception as e:
+                    if not allowPartial:
+                        for f in futures:
+                            f.cancel()
+                        raise
+                    result.errors[d] = f'{type(e).__name__}: {e}'
+        result.days = dict(sorted(result.days.items()))
+        return result
+
+    def getTimetableRange(self, start, end, skipWeekends: bool = False, holidays: list = None, maxWorkers: int = 8, allowPartial: bool = True, raw: bool = False) -> TimetableRange:
+        """
+        Get the timetable for every date from start to end (inclusive)
+        :param start: First date (date or dd/mm/YYYY)
+        :param end: Last date (date or dd/mm/YYYY)
+        :param skipWeekends: Don't fetch Saturdays and Sundays
+        :param holidays: Dates to skip (date or dd/mm/YYYY)
+        :param maxWorkers: Max timetable requests in flight
+        :param allowPartial: Keep the dates that worked and record failures in .errors instead of raising
+        :param raw: Keep each day's x['d'] dict instead of parsing it into a model
+        :return: TimetableRange
+        """
+        start, end = self._toDate(start), self._toDate(end)
+        skip = set(self._toDate(d) for d in holidays or [])
+        dates = []
+        d = start
+        while d <= end:
+            if d not in skip and not (skipWeekends and d.weekday() >= 5):
+                dates.append(d)
+            d += timedelta(days=1)
+        return self.getTimetables(dates, maxWorkers, allowPartial, raw)
+    
+    def getStaff(self, page: int = 1, start: int = 0, limit: int = 50, fields: List[str] = None, records: bool = False) -> List[User]:
+        """
+        Get All Staff Members
+        :param page: Page number
+        :param start: Start number
+        :param limit: Return limit
+        :param fields: Only parse these fields
+        :param records: Return lightweight slotted records (no validation) instead of models
+        :return: List[User]
+        """
+        data = {"sessionstate": "readonly", "userId": int(self.dt['userId']), "page": page, "start": start, "limit": limit}
+        x = self._cached('User.svc/GetAllStaff', f'{page}:{start}:{limit}', lambda: self._json('POST', 'User.svc/GetAllStaff', data))
+        return self._parse('User.svc/GetAllStaff', parseList, User, x['d'], fields, records)
+
+    def _paginate(self, fetchPage, pageSize: int, prefetch: bool):
+        # Pages are fetched on demand, the next one in the background while the current one is consumed
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='compass-page') if prefetch else None
+        pending = None
+        page = 1
+        try:
+            current = fetchPage(page, 0, pageSize)
+            while True:
+                more = len(current) == pageSize  # Short page = last page, longer = server ignored the limit
+                if more and executor:
+                    pending = executor.submit(fetchPage, page + 1, page * pageSize, pageSize)
+                for item in current:
+                    yield item
+                if not more:
+                    return
+                current = pending.result() if pending else fetchPage(page + 1, page * pageSize, pageSize)
+                pending = None
+                page += 1
+        finally:
+            if pending:
+                pending.cancel()
+            if executor:
+                executor.shutdown(wait=False)
+
+    def iterTasks(self, pageSize: int = 50, prefetch: bool = True, fields: List[str] = None, records: bool = False) -> Iterator[Task]:
+        """
+        Iterate over every task of the user, fetching pages as needed
+        :param pageSize: Tasks per request
+        :param prefetch: Fetch the next page in the background
+        :param fields: Only parse these fields
+        :param records: Return lightweight slotted records (no validation) instead of models
+        :return: Iterator[Task]
+        """
+        return self._paginate(lambda page, start, limit: self.getTasks(page, start, limit, fields, records), pageSize, prefetch)
+
+    def iterTaskCategories(self, pageSize: int = 50, prefetch: bool = True, fields: List[str] = None, records: bool = False) -> Iterator[TaskCategory]:
+        """
+        Iterate over every task category, fetching pages as needed
+        :param pageSize: Categories per request
+        :param prefetch: Fetch the next page in the background
+        :param fields: Only parse these fields
+        :param records: Return lightweight slotted records (no validation) instead of models
+        :return: Iterator[TaskCategory]
+        """
+        return self._paginate(lambda page, start, limit: self.getTaskCategories(page, start, limit, fields, records), pageSize, prefetch)
+
+    def iterLocations(self, pageSize: int = 50, prefetch: bool = True, fields: List[str] = None, records: bool = False) -> Iterator[Location]:
+        """
+        Iterate over every location on Campus, fetching pages as needed
+        :param pageSize: Locations per request
+        :param prefetch: Fetch the next page in the background
+        :param fields: Only parse these fields
+        :param records: Return lightweight slotted records (no validation) instead of models
+        :return: Iterator[Location]
+        """
+        return self._paginate(lambda page, start, limit: self.getLocations(page, start, limit, fields, records), pageSize, prefetch)
+
+    def iterStaff(self, pageSize: int = 50, prefetch: bool = True, fields: List[str] = None, records: bool = False) -> Iterator[User]:
+        """
+        Iterate over every staff member, fetching pages as needed
+        :param pageSize: Staff per request
+        :param prefetch: Fetch the next page in the background
+        :param fields: Only parse these fields
+        :param records: Return lightweight slotted records (no validation) instead of models
+        :return: Iterator[User]
+        """
+        return self._paginate(lambda page, start, limit: self.getStaff(page, start, limit, fields, records), pageSize, prefetch)
+
+    def streamTasks(self, limit: int = 100000, fields: List[str] = None, records: bool = False) -> Iterator[Task]:
+        """
+        Stream the tasks of the user in one request, decoding rows as they arrive
+        :param limit: Task limit
+        :param fields: Only parse these fields
+        :param records: Return lightweight slotted records (no validation) instead of models
+        :return: Iterator[Task]
+        """
+        data = {"sessionstate": "readonly", "userId": int(self.dt['userId']), "page": 1, "start": 0, "limit": limit}
+        return self._stream('POST', 'TaskService.svc/GetTaskItems', data, parse=rowParser(Task, fields, records))
+
+    def streamLocations(self, limit: int = 100000, fields: List[str] = None, records: bool = False) -> Iterator[Location]:
+        """
+        Stream every location on Campus in one request, decoding rows as they arrive
+        :param limit: Location limit
+        :param fields: Only parse these fields
+        :param records: Return lightweight slotted records (no validation) instead of models
+        :return: Iterator[Location]
+        """
+        return self._stream('GET', f'ReferenceDataCache.svc/GetAllLocations?sessionstate=readonly&page=1&start=0&limit={limit}', parse=rowParser(Location, fields, records))
+
+    def streamStaff(self, limit: int = 100000, fields: List[str] = None, records: bool = False) -> Iterator[User]:
+        """
+        Stream every staff member in one request, decoding rows as they arrive
+        :param limit: Return limit
+        :param fields: Only parse these fields
+        :param records: Return lightweight slotted records (no validation) instead of models
+        :return: Iterator[User]
+        """
+        data = {"sessionstate": "readonly", "userId": int(self.dt['userId']), "page": 1, "start": 0, "limit": limit}
+        return self._stream('POST', 'User.svc/GetAllStaff', data, parse=rowParser(User, fields, records))
+
+    def login(self) -> bool:
+        """
+        Attempt to login to Compass
+        :return: True if successful, False if not
+        """
+        if not self.user:
+            x = self._json('POST', 'Accounts.svc/GetAccount')
+            if 'h' in x:
+                raise UnauthorisedError(x['h'])
+            self.user = self._parse('Accounts.svc/GetAccount', Account.parse_obj, x['d'])
+            self.dt = {'userId': self.user.userId, 'cookie': self.cookie, 'subdomain': self.schoolSubdomain}
+            logging.info('Compass - Logged in', self.user)
+            return True
+        else:
+            logging.warning('Compass - Already logged in')
+            return True
@@ -0,0 +1,161 @@
+import os
+import tempfile
+import threading
+
+
+class Observer:
+    """
+    Instrumentation hooks for Compass, subclass and override the ones you need then pass it to
+    Compass(observers=[...]) or client.addObserver()
+    """
+
+    def onRequest(self, endpoint: str, seconds: float, nbytes: int, status: int):
+        """A request finished (network time only, parsing is reported separately)"""
+        pass
+
+    def onParse(self, endpoint: str, seconds: float, rows: int):
+        """A response was turned into models"""
+        pass
+
+    def onRetry(self, endpoint: str, attempt: int, error: Exception):
+        """A failed attempt is about to be retried"""
+        pass
+
+    def onError(self, endpoint: str, error: Exception):
+        """A call raised"""
+        pass
+
+
+class Histogram:
+    # Seconds, tuned for web requests (a Cloudflare challenge can take several seconds)
+    DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+    def __init__(self, buckets: tuple = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.sum += value
+        self.count += 1
+        for i, le in enumerate(self.buckets):
+            if value <= le:
+                self.counts[i] += 1
+
+    def asDict(self) -> dict:
+        return {'buckets': dict(zip(self.buckets, self.counts)), 'sum': self.sum, 'count': self.count}
+
+
+class EndpointMetrics:
+    def __init__(self):
+        self.requestSeconds = Histogram()
+        self.parseSeconds = Histogram()
+        self.bytesReceived = 0
+        self.rowsParsed = 0
+        self.retries = 0
+        self.errors = {}  # Exception class name -> count
+
+    def asDict(self) -> dict:
+        return {'requestSeconds': self.requestSeconds.asDict(), 'parseSeconds': self.parseSeconds.asDict(),
+                'bytesReceived': self.bytesReceived, 'rowsParsed': self.rowsParsed, 'retries': self.retries,
+                'errors': dict(self.errors)}
+
+
+class MetricsRecorder(Observer):
+    """Observer that keeps per-endpoint latency histograms and counters"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.endpoints = {}
+
+    def _endpoint(self, endpoint: str) -> EndpointMetrics:
+        if endpoint not in self.endpoints:
+            self.endpoints[endpoint] = EndpointMetrics()
+        return self.endpoints[endpoint]
+
+    def onRequest(self, endpoint: str, seconds: float, nbytes: int, status: int):
+        with self._lock:
+            m = self._endpoint(endpoint)
+            m.requestSeconds.observe(seconds)
+            m.bytesReceived += nbytes
+
+    def onParse(self, endpoint: str, seconds: float, rows: int):
+        with self._lock:
+            m = self._endpoint(endpoint)
+            m.parseSeconds.observe(seconds)
+            m.rowsParsed += rows
+
+    def onRetry(self, endpoint: str, attempt: int, error: Exception):
+        with self._lock:
+            self._endpoint(endpoint).retries += 1
+
+    def onError(self, endpoint: str, error: Exception):
+        with self._lock:
+            errors = self._endpoint(endpoint).errors
+            name = type(error).__name__
+            errors[name] = errors.get(name, 0) + 1
+
+    def snapshot(self) -> dict:
+        """
+        Copy of every endpoint's metrics
+        :return: {endpoint: {...}}
+        """
+        with self._lock:
+            return {e: m.asDict() for e, m in self.endpoints.items()}
+
+    def toPrometheus(self) -> str:
+        """
+        Render the metrics in the Prometheus text exposition format
+        :return: str
+        """
+        snap = self.snapshot()
+        lines = []
+
+        def histogram(name: str, help: str, key: str):
+            lines.append(f'# HELP {name} {help}')
+            lines.append(f'# TYPE {name} histogram')
+            for endpoint, m in snap.items():
+                h = m[key]
+                label = f'endpoint="{_escape(endpoint)}"'
+                for le, count in h['buckets'].items():
+                    lines.append(f'{name}_bucket{{{label},le="{le}"}} {count}')
+                lines.append(f'{name}_bucket{{{label},le="+Inf"}} {h["count"]}')
+                lines.append(f'{name}_sum{{{label}}} {h["sum"]}')
+                lines.append(f'{name}_count{{{label}}} {h["count"]}')
+
+        def counter(name: str, help: str, key: str):
+            lines.append(f'# HELP {name} {help}')
+            lines.append(f'# TYPE {name} counter')
+            for endpoint, m in snap.items():
+                lines.append(f'{name}{{endpoint="{_escape(endpoint)}"}} {m[key]}')
+
+        histogram('compass_request_seconds', 'Network time of Compass requests', 'requestSeconds')
+        histogram('compass_parse_seconds', 'Time spent turning responses into models', 'parseSeconds')
+        counter('compass_response_bytes_total', 'Response bytes received', 'bytesReceived')
+        counter('compass_rows_parsed_total', 'Rows turned into models', 'rowsParsed')
+        counter('compass_retries_total', 'Retried attempts', 'retries')
+        lines.append('# HELP compass_errors_total Errors raised, by exception class')
+        lines.append('# TYPE compass_errors_total counter')
+        for endpoint, m in snap.items():
+            for error, count in m['errors'].items():
+                lines.append(f'compass_errors_total{{endpoint="{_escape(endpoint)}",error="{error}"}} {count}')
+        return '\n'.join(lines) + '\n'
+
+    def writePrometheus(self, path: str):
+        """
+        Write the metrics to a file (Eg. for the node_exporter textfile collector), replaced atomically
+        :param path: File to write
+        """
+        with tempfile.NamedTemporaryFile('w', dir=os.path.dirname(path) or '.', prefix=os.path.basename(path), suffix='.tmp',
+                                         delete=False) as f:
+            f.write(self.toPrometheus())
+        try:
+            os.replace(f.name, path)
+        except OSError:
+            os.remove(f.name)
+            raise
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
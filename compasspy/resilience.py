@@ -0,0 +1,147 @@
+import random
+import threading
+import time
+from .errors import *
+
+
+class SingleFlight:
+    """
+    Coalesces identical in-flight calls: the first caller for a key does the work and every caller
+    waiting on the same key gets its result (or error). The result object is shared, don't mutate it
+    """
+
+    class _Call:
+        def __init__(self):
+            self.done = threading.Event()
+            self.result = None
+            self.error = None
+            self.waiters = 0
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.coalesced = 0  # Calls that were answered by another caller's request
+
+    def do(self, key, func):
+        """
+        Run func once per key at a time
+        :param key: Hashable key identifying the call
+        :param func: Callable doing the work
+        :return: The result of func
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = self._Call()
+            else:
+                call.waiters += 1
+                self.coalesced += 1
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = func()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+
+class RetryPolicy:
+    """Jittered exponential backoff"""
+
+    def __init__(self, attempts: int = 3, baseDelay: float = 0.5, maxDelay: float = 8.0):
+        """
+        :param attempts: Total tries including the first one
+        :param baseDelay: Delay before the first retry, doubled for each one after
+        :param maxDelay: Cap on a single delay
+        """
+        self.attempts = attempts
+        self.baseDelay = baseDelay
+        self.maxDelay = maxDelay
+
+    def delay(self, retry: int) -> float:
+        # "Full jitter", spreads out callers that all started failing at once
+        return random.uniform(0, min(self.maxDelay, self.baseDelay * 2 ** (retry - 1)))
+
+
+class CircuitBreaker:
+    """
+    Per-endpoint circuit breaker
+    After failureThreshold failures in a row calls fail fast with CircuitOpenError for resetTimeout
+    seconds, then one trial call is let through (half-open) to decide whether to close again
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+
+    def __init__(self, name: str, failureThreshold: int = 5, resetTimeout: float = 30.0):
+        self.name = name
+        self.failureThreshold = failureThreshold
+        self.resetTimeout = resetTimeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.openedAt = 0.0
+        self._lock = threading.Lock()
+
+    def before(self):
+        """Raise CircuitOpenError if calls should not go out right now"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return
+            if self.state == self.OPEN and time.monotonic() - self.openedAt >= self.resetTimeout:
+                self.state = self.HALF_OPEN
+                return  # This caller is the trial call
+            raise CircuitOpenError(f'{self.name} is failing, retry in {max(0.0, self.resetTimeout - (time.monotonic() - self.openedAt)):.0f}s')
+
+    def success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failureThreshold:
+                self.state = self.OPEN
+                self.openedAt = time.monotonic()
+
+
+class RateLimiter:
+    """
+    Spaces requests out to at most rate per second
+    Pass a multiprocessing Manager's Lock() and Value('d', 0.0) as lock / nextSlot to share one limit
+    between clients in different processes (Eg. every account of one school)
+    """
+
+    def __init__(self, rate: float, lock=None, nextSlot=None):
+        """
+        :param rate: Requests per second
+        :param lock: Lock guarding nextSlot (Default: a threading.Lock, shared by threads only)
+        :param nextSlot: Anything with a .value holding the unix time the next request may go out
+        """
+        self.interval = 1.0 / rate
+        self._lock = lock or threading.Lock()
+        self._nextSlot = nextSlot
+        self._localSlot = 0.0
+
+    def acquire(self) -> float:
+        """Wait for this request's slot, returns the seconds waited"""
+        with self._lock:
+            now = time.time()  # Wall clock, the slot is compared between processes
+            slot = max(now, self._nextSlot.value if self._nextSlot is not None else self._localSlot)
+            if self._nextSlot is not None:
+                self._nextSlot.value = slot + self.interval
+            else:
+                self._localSlot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+        return max(0.0, slot - now)
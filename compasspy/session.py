@@ -0,0 +1,62 @@
+import threading
+import cloudscraper
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+
+class ConnectionStats:
+    """Counts requests sent over a session and how many of them needed a new connection"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.newConnections = 0
+
+    @property
+    def reusedConnections(self) -> int:
+        """Requests that went out over an already open (keep-alive) connection"""
+        return max(0, self.requests - self.newConnections)
+
+    def countRequest(self):
+        with self._lock:
+            self.requests += 1
+
+    def countConnection(self):
+        with self._lock:
+            self.newConnections += 1
+
+    def reset(self):
+        with self._lock:
+            self.requests = 0
+            self.newConnections = 0
+
+    def __repr__(self):
+        return f'ConnectionStats(requests={self.requests}, new={self.newConnections}, reused={self.reusedConnections})'
+
+
+def _countingPool(base, stats: ConnectionStats):
+    class CountingPool(base):
+        def _new_conn(self):
+            stats.countConnection()
+            return super()._new_conn()
+    return CountingPool
+
+
+def createSession(stats: ConnectionStats, poolConnections: int = 4, poolMaxsize: int = 10, poolBlock: bool = False):
+    """
+    Create one long-lived cloudscraper session with a sized keep-alive pool
+    :param stats: ConnectionStats to count new / reused connections into
+    :param poolConnections: Number of host pools to keep
+    :param poolMaxsize: Max open connections kept per host
+    :param poolBlock: Block when the pool is exhausted instead of opening extra connections
+    :return: cloudscraper.CloudScraper
+    """
+    scraper = cloudscraper.create_scraper()
+    for adapter in scraper.adapters.values():
+        # Re-init keeps cloudscraper's own ssl context (CipherSuiteAdapter), only the pool is resized
+        adapter.init_poolmanager(poolConnections, poolMaxsize, block=poolBlock)
+        adapter.poolmanager.pool_classes_by_scheme = {
+            'http': _countingPool(HTTPConnectionPool, stats),
+            'https': _countingPool(HTTPSConnectionPool, stats)
+        }
+    scraper.hooks['response'].append(lambda r, *args, **kwargs: stats.countRequest())
+    return scraper
@@ -0,0 +1,100 @@
+import codecs
+import json
+
+# Incremental JSON decoding for large Compass responses
+# Compass wraps every result as {"d": ...}. Rather than holding the whole body, the full dict tree and the
+# model list at once, items of the "d" array are decoded one at a time as the bytes arrive
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = ' \t\n\r'
+
+
+class _Buffer:
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        self.text = ''
+        self.pos = 0
+        self.eof = False
+
+    def more(self) -> bool:
+        if self.eof:
+            return False
+        chunk = next(self.chunks, None)
+        if chunk is None:
+            self.eof = True
+            data = self.decoder.decode(b'', final=True)
+        else:
+            data = self.decoder.decode(chunk)
+        # Drop what has already been consumed so the buffer stays about one chunk long
+        self.text = self.text[self.pos:] + data
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Next non-whitespace character, '' at the end of the body"""
+        while True:
+            while self.pos < len(self.text) and self.text[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.text):
+                return self.text[self.pos]
+            if not self.more():
+                return ''
+
+    def expect(self, char: str):
+        if self.peek() != char:
+            raise ValueError(f'Expected {char!r} at stream offset {self.pos}')
+        self.pos += 1
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.text, self.pos)
+                # A value ending right at the buffer edge may be cut short (Eg. a number), so only trust it once more data or EOF follows
+                if end < len(self.text) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self.more()
+
+
+def iterItems(chunks, key: str = 'd'):
+    """
+    Yield the items of the top level key array from a stream of JSON bytes
+    :param chunks: Iterable of bytes (Eg. response.iter_content())
+    :param key: Top level key holding the array
+    :return: Iterator of decoded items
+    """
+    buf = _Buffer(chunks)
+    buf.expect('{')
+    while True:
+        c = buf.peek()
+        if c == '}':
+            raise ValueError(f'Response has no {key!r} key')
+        if c == ',':
+            buf.pos += 1
+            continue
+        k = buf.value()
+        buf.expect(':')
+        if k != key:
+            buf.value()  # Skip other top level values
+            continue
+        if buf.peek() != '[':
+            value = buf.value()
+            if value is None:
+                return
+            raise ValueError(f'{key!r} is not an array')
+        buf.pos += 1
+        while True:
+            c = buf.peek()
+            if c == ']':
+                return
+            if c == ',':
+                buf.pos += 1
+                continue
+            if c == '':
+                raise ValueError('Response ended inside the array')
+            yield buf.value()
@@ -0,0 +1,81 @@
+import re
+
+# Resolves the teacher and room of a lesson from its "topAndBottomLine"
+# Every staff code (and every room) is folded into one precompiled alternation, so a line is scanned
+# once instead of running a fresh re.search per staff member / room.
+
+
+def _whole_word(codes):
+    # Longest first so a code never loses to a shorter code it starts with
+    codes = sorted(set(codes), key=len, reverse=True)
+    if not codes:
+        return None
+    return re.compile(r'(?<!\w)(?:' + '|'.join(re.escape(c) for c in codes) + r')(?!\w)')
+
+
+class LessonAnnotator:
+    """Built once from getStaff() / getLocations() (anything with displayCode + n / n) and the room alias table"""
+
+    def __init__(self, teachers, rooms, aliases=()):
+        # Ties go to whoever comes first in the staff / room list, same as the old linear scans
+        self.teacher_rank = {}
+        self.teacher_names = {}
+        for rank, teacher in enumerate(teachers):
+            if teacher.displayCode and teacher.displayCode not in self.teacher_rank:
+                self.teacher_rank[teacher.displayCode] = rank
+                self.teacher_names[teacher.displayCode] = teacher.n
+        self.teacher_pattern = _whole_word(self.teacher_rank)
+
+        # Compass rooms win over the alias table, which is only a fallback: [code, alias] matches either spelling
+        self.room_rank = {}
+        self.room_names = {}
+        for rank, room in enumerate(rooms):
+            if room.n and room.n not in self.room_rank:
+                self.room_rank[room.n] = rank
+                self.room_names[room.n] = room.n
+        offset = len(self.room_rank)
+        for rank, (code, alias) in enumerate(aliases):
+            for spelling in (code, alias):
+                if spelling and spelling not in self.room_rank:
+                    self.room_rank[spelling] = offset + rank
+                    self.room_names[spelling] = code
+        self.room_pattern = _whole_word(self.room_rank)
+
+        self._memo = {}  # Lesson lines repeat every week, so a term only has a few hundred distinct ones
+
+    @staticmethod
+    def _best(pattern, rank, line):
+        if pattern is None or not line:
+            return None
+        found = None
+        for m in pattern.finditer(line):
+            code = m.group()
+            if found is None or rank[code] < rank[found]:
+                found = code
+        return found
+
+    def teacher(self, line):
+        """Full name of the teacher whose display code is in line, or None"""
+        return self.annotate(line)[0]
+
+    def room(self, line, default="NA"):
+        """Room code in line, or default"""
+        return self.annotate(line)[1] or default
+
+    def annotate(self, line):
+        """
+        Resolve a lesson line
+        :param line: topAndBottomLine of a lesson
+        :return: (teacher name or None, room or None)
+        """
+        result = self._memo.get(line)
+        if result is None:
+            code = self._best(self.teacher_pattern, self.teacher_rank, line)
+            room = self._best(self.room_pattern, self.room_rank, line)
+            result = self._memo[line] = (self.teacher_names[code] if code else None, self.room_names[room] if room else None)
+        return result
+
+    def annotate_all(self, lines):
+        """Resolve a whole day or term of lesson lines in one pass, returns a list of (teacher, room)"""
+        annotate = self.annotate
+        return [annotate(line) for line in lines]
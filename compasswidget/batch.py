@@ -0,0 +1,165 @@
+import argparse
+import json
+import multiprocessing
+import sys
+import time
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import date, datetime
+
+from compasspy.client import Compass
+from compasspy.resilience import RateLimiter
+from annotator import LessonAnnotator
+from lessons import normalize_lessons
+from timetable import locations
+
+# Batch timetable engine: runs the timetable pipeline for many accounts (and schools) on a process pool
+# Staff / rooms are fetched once per school and handed to every account of it, and each school gets one
+# request rate limit shared by all of its processes. Results are written as newline delimited JSON.
+#
+# Manifest: one JSON object per line
+#   {"subdomain": "school", "cookie": "ASP.NET_SessionId", "start": "2025-02-03", "end": "7/02/2025", "id": "optional name"}
+# Output: one line per account and day
+#   {"account": ..., "subdomain": ..., "date": "2025-02-03", "lessons": [...]}  or  {..., "error": "..."}
+
+# Plain tuples so they pickle between processes and still look like Compass records to LessonAnnotator
+Staff = namedtuple('Staff', 'displayCode n')
+Room = namedtuple('Room', 'n')
+
+
+def _day(text):
+    """'YYYY-MM-DD' or 'd/mm/YYYY' -> date"""
+    if isinstance(text, date):
+        return text
+    if '-' in text:
+        return date.fromisoformat(text)
+    return datetime.strptime(text, "%d/%m/%Y").date()
+
+
+def fetch_reference(subdomain, cookies, rateLimit=None):
+    """
+    Staff and rooms of a school, with the first account whose cookie works
+    :return: ([Staff], [Room])
+    """
+    error = None
+    for cookie in cookies:
+        try:
+            # Logged in inside the with, so a cookie that doesn't work still closes its session
+            with Compass(subdomain, cookie, rateLimit=rateLimit) as client:
+                client.login()
+                staff = [Staff(i.displayCode, i.n) for i in client.iterStaff(fields=['displayCode', 'n'], records=True)]
+                rooms = [Room(i.n) for i in client.iterLocations(fields=['n'], records=True)]
+                return staff, rooms
+        except Exception as e:
+            error = e
+    raise error or ValueError(f"No accounts for {subdomain}")
+
+
+def fetch_account(job, staff, rooms, rateLimit=None, concurrency=4, skipWeekends=True):
+    """
+    Timetable of one account for its date range
+    :param job: Manifest entry
+    :return: (NDJSON lines, how many of them are errors)
+    """
+    base = {'account': job['id'], 'subdomain': job['subdomain']}
+    annotator = LessonAnnotator(staff, rooms, locations)
+    lines = []
+    errors = 0
+    with Compass(job['subdomain'], job['cookie'], poolMaxsize=max(10, concurrency), rateLimit=rateLimit) as client:
+        try:
+            client.login()
+            timetables = client.getTimetableRange(_day(job['start']), _day(job['end']), skipWeekends, maxWorkers=concurrency, raw=True)
+        except Exception as e:
+            return [json.dumps({**base, 'date': None, 'error': f"{type(e).__name__}: {e}"})], 1
+    for d, error in timetables.errors.items():
+        lines.append(json.dumps({**base, 'date': d.isoformat(), 'error': error}))
+        errors += 1
+    for d, x in timetables.days.items():
+        try:
+            lessons = normalize_lessons(x['data'], annotator)
+            lines.append(json.dumps({**base, 'date': d.isoformat(), 'lessons': [l.to_dict() for l in lessons]}, separators=(',', ':')))
+        except Exception as e:
+            lines.append(json.dumps({**base, 'date': d.isoformat(), 'error': f"{type(e).__name__}: {e}"}))
+            errors += 1
+    return lines, errors
+
+
+def read_manifest(path):
+    jobs = []
+    with open(path) as f:
+        for n, line in enumerate(f):
+            if line.strip():
+                job = json.loads(line)
+                job.setdefault('id', f"{job['subdomain']}/{n}")
+                jobs.append(job)
+    return jobs
+
+
+def run(jobs, output, processes=None, rate=5.0, concurrency=4, skipWeekends=True):
+    """
+    Run a manifest
+    :param jobs: Manifest entries
+    :param output: Writable text file for the NDJSON lines
+    :param processes: Worker processes (Default: one per core)
+    :param rate: Requests per second allowed per school, over all of its accounts (None for no limit)
+    :param concurrency: Timetable requests in flight per account
+    :return: {'accounts', 'days' (timetables written), 'errors' (error lines written), 'seconds'}
+    """
+    started = time.perf_counter()
+    schools = {}
+    for job in jobs:
+        schools.setdefault(job['subdomain'], []).append(job)
+    stats = {'accounts': len(jobs), 'days': 0, 'errors': 0}
+
+    def write(lines, errors):
+        for line in lines:
+            output.write(line + '\n')
+        stats['days'] += len(lines) - errors  # Only days that made it, failures are counted in errors
+        stats['errors'] += errors
+
+    with multiprocessing.Manager() as manager, ProcessPoolExecutor(max_workers=processes) as pool:
+        limits = {s: RateLimiter(rate, manager.Lock(), manager.Value('d', 0.0)) if rate else None for s in schools}
+        # Accounts of a school are queued as soon as its reference data is in, so schools overlap
+        pending = {pool.submit(fetch_reference, s, [j['cookie'] for j in js], limits[s]): (s, None) for s, js in schools.items()}
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                school, job = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    failed = schools[school] if job is None else [job]
+                    write([json.dumps({'account': j['id'], 'subdomain': school, 'date': None, 'error': f"{type(e).__name__}: {e}"}) for j in failed], len(failed))
+                    continue
+                if job is None:
+                    staff, rooms = result
+                    for j in schools[school]:
+                        pending[pool.submit(fetch_account, j, staff, rooms, limits[school], concurrency, skipWeekends)] = (school, j)
+                else:
+                    write(*result)
+    stats['seconds'] = time.perf_counter() - started
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fetch and annotate timetables for every account in a manifest")
+    parser.add_argument('manifest', help="NDJSON file of {subdomain, cookie, start, end[, id]}")
+    parser.add_argument('-o', '--output', default='-', help="NDJSON output file (Default: stdout)")
+    parser.add_argument('-p', '--processes', type=int, default=None, help="Worker processes (Default: one per core)")
+    parser.add_argument('--rate', type=float, default=5.0, help="Requests per second per school, 0 for no limit")
+    parser.add_argument('--concurrency', type=int, default=4, help="Timetable requests in flight per account")
+    parser.add_argument('--weekends', action='store_true', help="Fetch Saturdays and Sundays too")
+    args = parser.parse_args(argv)
+
+    jobs = read_manifest(args.manifest)
+    output = sys.stdout if args.output == '-' else open(args.output, 'w')
+    try:
+        stats = run(jobs, output, args.processes, args.rate or None, args.concurrency, not args.weekends)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    print(f"{stats['accounts']} accounts, {stats['days']} days, {stats['errors']} errors in {stats['seconds']:.2f}s", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
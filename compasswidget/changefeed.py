@@ -0,0 +1,121 @@
+from lessons import lesson_from_row, row_key
+
+# Incremental timetable refresh
+# The previous state is kept keyed by Lesson.key (instanceId, or activityId + start), each refresh only
+# rebuilds rows whose raw fields changed, and the UI is sent the differences instead of the whole day.
+
+ADDED = 'added'
+REMOVED = 'removed'
+ROOM = 'room'
+TEACHER = 'teacher'
+TIME = 'time'
+CANCELLED = 'cancelled'  # runningStatus went from 1 to something else
+REINSTATED = 'reinstated'
+DETAILS = 'details'  # Title / lesson line changed without moving room or teacher
+
+
+class Change:
+    __slots__ = ('kind', 'key', 'old', 'new')
+
+    def __init__(self, kind, key, old, new):
+        self.kind = kind
+        self.key = key
+        self.old = old  # Lesson before (None when added)
+        self.new = new  # Lesson after (None when removed)
+
+    def __repr__(self):
+        lesson = self.new or self.old
+        if self.kind in (ROOM, TEACHER):
+            attr = 'room' if self.kind == ROOM else 'teacher'
+            return f"Change({self.kind}, {lesson.title!r}, {getattr(self.old, attr)!r} -> {getattr(self.new, attr)!r})"
+        return f"Change({self.kind}, {lesson!r})"
+
+
+def diff_lessons(old, new):
+    """
+    Changes turning one state into another
+    :param old: {Lesson.key: Lesson}
+    :param new: {Lesson.key: Lesson}
+    :return: list of Change, in start order
+    """
+    changes = []
+    for key, after in new.items():
+        before = old.get(key)
+        if before is None:
+            changes.append(Change(ADDED, key, None, after))
+        elif before is not after:  # The same object means the row didn't change at all
+            count = len(changes)
+            if before.running and not after.running:
+                changes.append(Change(CANCELLED, key, before, after))
+            elif after.running and not before.running:
+                changes.append(Change(REINSTATED, key, before, after))
+            if (before.day, before.start, before.finish) != (after.day, after.start, after.finish):
+                changes.append(Change(TIME, key, before, after))
+            if before.room != after.room:
+                changes.append(Change(ROOM, key, before, after))
+            if before.teacher != after.teacher:
+                changes.append(Change(TEACHER, key, before, after))
+            if len(changes) == count and (before.title, before.short_title, before.line, before.all_day) != (after.title, after.short_title, after.line, after.all_day):
+                changes.append(Change(DETAILS, key, before, after))
+    for key, before in old.items():
+        if key not in new:
+            changes.append(Change(REMOVED, key, before, None))
+    changes.sort(key=lambda c: ((c.new or c.old).day, (c.new or c.old).start))
+    return changes
+
+
+def apply_changes(lessons, changes):
+    """Apply changes to a {Lesson.key: Lesson} state in place, returns it"""
+    for c in changes:
+        if c.kind == REMOVED:
+            lessons.pop(c.key, None)
+        else:
+            lessons[c.key] = c.new
+    return lessons
+
+
+def _signature(row):
+    # Everything a Lesson is built from
+    return (row["topAndBottomLine"], row["topTitleLine"], row["start"], row["finish"], row["runningStatus"], row["allDay"])
+
+
+class ChangeFeed:
+    """Previous state of one timetable (a day, or a range of days) and the raw rows it was built from"""
+
+    def __init__(self):
+        self.lessons = {}  # Lesson.key -> Lesson
+        self.signatures = {}  # Lesson.key -> raw fields
+        self.rebuilt = 0  # Rows turned into Lessons by the last update
+
+    @property
+    def fresh(self):
+        """Nothing seen yet, so the next update reports every lesson as added"""
+        return not self.signatures
+
+    def update(self, rows, annotator):
+        """
+        Take a new GetScheduleLinesForDate response
+        :param rows: timetableRaw['d']['data']
+        :param annotator: LessonAnnotator, only used for rows that changed
+        :return: list of Change (empty when nothing changed)
+        """
+        lessons = {}
+        signatures = {}
+        self.rebuilt = 0
+        for row in rows:
+            signature = _signature(row)
+            key = row_key(row)
+            if self.signatures.get(key) == signature:
+                lesson = self.lessons[key]
+            else:
+                lesson = lesson_from_row(row, annotator)
+                self.rebuilt += 1
+            lessons[key] = lesson
+            signatures[key] = signature
+        changes = diff_lessons(self.lessons, lessons)
+        self.lessons = lessons
+        self.signatures = signatures
+        return changes
+
+    def sorted(self):
+        return sorted(self.lessons.values(), key=lambda l: (l.day, l.start))
@@ -0,0 +1,142 @@
+import heapq
+from datetime import date
+import numpy as np
+from PyQt6.QtGui import QColor
+
+# Columnar events for TimelineGraph
+# Day, start, end, layout column and colour (an id into a small palette of QColors) are numpy columns sorted by
+# day and start, so the visible events are a searchsorted and their rectangles a few array operations per paint,
+# instead of Python objects each doing their own maths. Names are plain lists, only read for the events drawn.
+
+
+def partition_columns(days, starts, ends):
+    """
+    Side by side columns for overlapping intervals, sweep line interval partitioning in O(n log n)
+    Intervals that overlap (directly or through a chain) on the same day form a cluster, and only the intervals of
+    a cluster share its column count
+    :param days / starts / ends: Sequences sorted by (day, start, end)
+    :return: (column, total columns) lists
+    """
+    n = len(starts)
+    column = [0] * n
+    total = [1] * n
+    active = []  # (end, column) of intervals still running at the sweep position
+    free = []  # Columns of the current cluster that have become free again
+    cluster = 0  # Index the current cluster starts at
+    columns = 0
+    day = None
+    for i in range(n):
+        if days[i] != day:
+            active = []  # Another day, nothing carries over
+            day = days[i]
+        while active and active[0][0] <= starts[i]:
+            heapq.heappush(free, heapq.heappop(active)[1])
+        if not active and i > cluster:
+            # Nothing running, so nothing later can overlap the intervals so far
+            total[cluster:i] = [columns] * (i - cluster)
+            cluster = i
+            free = []
+            columns = 0
+        if free:
+            column[i] = heapq.heappop(free)  # Lowest free column
+        else:
+            column[i] = columns
+            columns += 1
+        heapq.heappush(active, (ends[i], column[i]))
+    total[cluster:n] = [columns] * (n - cluster)
+    return column, total
+
+
+class EventStore:
+    def __init__(self, days, starts, ends, colors, names, secondary, palette):
+        """
+        Prefer from_events / from_lessons
+        :param days: date.toordinal() per event, 0 for undated
+        :param starts / ends: Hours (floats)
+        :param colors: Ids into palette
+        :param palette: List of (fill QColor, border QColor)
+        """
+        days = np.asarray(days, dtype='i4')
+        starts = np.asarray(starts, dtype='f8')
+        ends = np.asarray(ends, dtype='f8')
+        order = np.lexsort((ends, starts, days))
+        self.day = days[order]
+        self.start = starts[order]
+        self.end = ends[order]
+        self.color = np.asarray(colors, dtype='i2')[order]
+        self.name = [names[i] for i in order]
+        self.secondary = [secondary[i] for i in order]
+        self.palette = palette
+
+        column, total = partition_columns(self.day.tolist(), self.start.tolist(), self.end.tolist())
+        self.column = np.array(column, dtype='i4')
+        self.columns = np.array(total, dtype='i4')
+
+        # Absolute hours, sorted, and the latest end so far (never decreases), so both ends of a time window are
+        # a searchsorted even with long events spanning shorter ones
+        self._starts = self.day * 24.0 + self.start
+        self._reach = np.maximum.accumulate(self.day * 24.0 + self.end) if len(self) else self._starts
+
+    def __len__(self):
+        return len(self.day)
+
+    @property
+    def days(self):
+        """Dates with events, in order (undated events aren't on one)"""
+        return [date.fromordinal(d) for d in np.unique(self.day).tolist() if d]
+
+    @staticmethod
+    def _color_id(palette, ids, color, border_color):
+        key = (color.rgba(), border_color.rgba())
+        if key not in ids:
+            ids[key] = len(palette)
+            palette.append((QColor(color), QColor(border_color)))
+        return ids[key]
+
+    @classmethod
+    def from_events(cls, events):
+        """From graph.Event objects"""
+        palette = []
+        ids = {}
+        return cls([ev.day.toordinal() if ev.day is not None else 0 for ev in events],
+                   [ev.start_hour for ev in events], [ev.end_hour for ev in events],
+                   [cls._color_id(palette, ids, ev.color, ev.border_color) for ev in events],
+                   [ev.name for ev in events], [ev.secondary_text for ev in events], palette)
+
+    @classmethod
+    def from_lessons(cls, lessons, color=QColor(50, 100, 255, 150), border_color=QColor(0, 0, 0), secondary=None):
+        """
+        Straight from lessons.Lesson objects, without an Event (and its QColors) per lesson
+        :param secondary: Function giving a lesson's second line, Eg. lambda l: l.room (Default: none)
+        """
+        palette = [(QColor(color), QColor(border_color))]
+        return cls([l.day.toordinal() for l in lessons], [l.start / 60 for l in lessons], [l.finish / 60 for l in lessons],
+                   [0] * len(lessons), [l.title for l in lessons],
+                   [secondary(l) if secondary else "" for l in lessons], palette)
+
+    def visible(self, day, start, end):
+        """
+        Indexes of the events of a day overlapping [start, end) (hours)
+        :param day: date, or None for undated events
+        """
+        offset = (day.toordinal() if day is not None else 0) * 24.0
+        lo = np.searchsorted(self._reach, offset + start, 'right')
+        hi = np.searchsorted(self._starts, offset + end, 'left')
+        index = np.arange(lo, max(lo, hi))
+        return index[self.end[index] + offset > offset + start] if len(index) else index
+
+    def rects(self, index, left, top, view_start, hour_step, day_width, h_padding):
+        """
+        Event rectangles in widget pixels, all at once
+        :param index: Event indexes (from visible)
+        :param left: x of each event's day column (array, or one number for all)
+        :param top: y of view_start
+        :return: (x, y, width, height) int arrays
+        """
+        y_start = (top + (self.start[index] - view_start) * hour_step).astype(int)
+        y_end = (top + (self.end[index] - view_start) * hour_step).astype(int)
+        height = np.maximum(11, y_end - y_start)
+        column_width = (day_width - 10) / self.columns[index]
+        x_start = (left + self.column[index] * column_width + h_padding).astype(int)
+        width = (column_width - h_padding * 2).astype(int)
+        return x_start, y_start, width, height
@@ -0,0 +1,285 @@
+import asyncio
+import inspect
+import itertools
+import multiprocessing
+import threading
+from collections import deque
+from multiprocessing.connection import wait
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+
+# Compass I/O (and cloudscraper's CPU heavy challenge solving) runs in a separate process so the
+# Qt GUI thread never blocks. Jobs are module level functions called as func(client, *args) in the
+# worker, where client is an AsyncCompass. Coroutine functions are run to completion there.
+
+
+def _worker_main(schoolSubdomain, cookie, options, jobs, results):
+    from compasspy.asyncclient import AsyncCompass
+    from compasspy.cache import CompassCache
+    from compasspy.clearance import ClearanceStore
+
+    client = AsyncCompass(schoolSubdomain, cookie,
+                          cache=CompassCache() if options.get('cache', True) else None,
+                          clearance=ClearanceStore() if options.get('clearance', True) else None)
+    loop = asyncio.new_event_loop()
+    pending = deque()
+    cancelled = set()
+
+    def handle(msg):
+        if msg is None:
+            return False
+        if msg[0] == 'cancel':
+            cancelled.add(msg[1])
+        else:
+            pending.append(msg[1:])
+        return True
+
+    running = True
+    while running:
+        try:
+            if not pending:
+                running = handle(jobs.recv())
+            # Pick up anything queued behind, so cancels for waiting jobs are seen before they start
+            while running and jobs.poll():
+                running = handle(jobs.recv())
+        except EOFError:
+            break
+        if not running or not pending:
+            continue
+        job_id, func, args, kwargs = pending.popleft()
+        if job_id in cancelled:
+            cancelled.discard(job_id)
+            continue
+        try:
+            result = func(client, *args, **kwargs)
+            if inspect.isawaitable(result):
+                result = loop.run_until_complete(result)
+            results.send((job_id, True, result))
+        except Exception as e:
+            results.send((job_id, False, f"{type(e).__name__}: {e}"))
+    client.close()
+    loop.close()
+
+
+class FetchWorker(QObject):
+    """Runs Compass calls for one account in a worker process and reports back through signals"""
+    finished = pyqtSignal(int, object)  # job id, result
+    failed = pyqtSignal(int, str)  # job id, error
+    restarted = pyqtSignal(str)  # reason the worker process was restarted
+
+    _received = pyqtSignal(int, object)  # generation, message (from the reader thread)
+    _died = pyqtSignal(int)  # generation
+
+    def __init__(self, schoolSubdomain, cookie, timeout=60.0, cache=True, clearance=True, max_crashes=5, parent=None):
+        super().__init__(parent)
+        self.schoolSubdomain = schoolSubdomain
+        self.cookie = cookie
+        self.timeout = timeout
+        self.options = {'cache': cache, 'clearance': clearance}
+        self._ids = itertools.count(1)
+        self._jobs = {}  # job id -> (func, args, kwargs, timeout), in submission order
+        # Jobs run one at a time in submission order, so only the oldest one is timed
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self._on_timeout)
+        self._generation = 0
+        self._process = None
+        self._conn = None
+        self._stopping = False
+        self.max_crashes = max_crashes
+        self._crashes = 0  # In a row, reset whenever the process answers
+        self._received.connect(self._on_received)
+        self._died.connect(self._on_died)
+        self._start()
+
+    def _start(self):
+        self._generation += 1  # Anything an older process still sends is ignored
+        ctx = multiprocessing.get_context('spawn')
+        jobs_recv, jobs_send = ctx.Pipe(duplex=False)
+        results_recv, results_send = ctx.Pipe(duplex=False)
+        self._process = ctx.Process(target=_worker_main, args=(self.schoolSubdomain, self.cookie, self.options, jobs_recv, results_send), daemon=True)
+        self._process.start()
+        jobs_recv.close()
+        results_send.close()
+        self._conn = jobs_send
+        threading.Thread(target=self._read, args=(self._generation, results_recv, self._process.sentinel), daemon=True).start()
+        # Jobs that were waiting when the previous process went away
+        for job_id, (func, args, kwargs, timeout) in self._jobs.items():
+            self._conn.send(('call', job_id, func, args, kwargs))
+        self._arm()
+
+    def _read(self, generation, conn, sentinel):
+        # Blocks on the pipe and the process handle, so there's no polling on either side
+        while True:
+            ready = wait([conn, sentinel])
+            if conn not in ready:
+                break
+            try:
+                msg = conn.recv()
+            except (EOFError, OSError):
+                break
+            self._received.emit(generation, msg)
+        conn.close()
+        self._died.emit(generation)
+
+    def _restart(self, reason):
+        old = self._process
+        if old.is_alive():
+            old.terminate()
+        self._conn.close()
+        self._start()
+        self.restarted.emit(reason)
+
+    def submit(self, func, *args, timeout=None, **kwargs):
+        """
+        Queue a job for the worker process
+        :param func: Module level function called as func(client, *args, **kwargs)
+        :param timeout: Seconds before the job fails and the worker is restarted (Default: self.timeout)
+        :return: Job id, passed back through finished / failed
+        """
+        job_id = next(self._ids)
+        if self._stopping:
+            self._fail_later(job_id, "Worker process keeps crashing" if self._crashes > self.max_crashes else "Worker stopped")
+            return job_id
+        self._jobs[job_id] = (func, args, kwargs, timeout or self.timeout)
+        try:
+            self._conn.send(('call', job_id, func, args, kwargs))
+        except OSError as e:
+            # The process went away, _on_died restarts it and resends whatever is still queued
+            self._forget(job_id)
+            self._fail_later(job_id, f"{type(e).__name__}: {e}")
+            return job_id
+        if len(self._jobs) == 1:
+            self._arm()
+        return job_id
+
+    def _fail_later(self, job_id, error):
+        # After submit returns, so the caller knows the job id before its failure arrives
+        QTimer.singleShot(0, lambda: self.failed.emit(job_id, error))
+
+    def cancel(self, job_id, terminate=False):
+        """
+        Cancel a job, its result is never delivered
+        :param job_id: Job to cancel
+        :param terminate: Also kill the worker process if the job is already running
+        """
+        if job_id not in self._jobs:
+            return
+        running = next(iter(self._jobs)) == job_id
+        self._forget(job_id)
+        if running and terminate:
+            self._restart('cancelled')
+        elif not self._stopping:
+            try:
+                self._conn.send(('cancel', job_id))
+            except OSError:
+                pass  # The process is gone, so is the job
+
+    def pending(self):
+        return list(self._jobs)
+
+    def _arm(self):
+        # (Re)start the timeout for the job that is running now
+        self._timer.stop()
+        if self._jobs and not self._stopping:
+            self._timer.start(int(next(iter(self._jobs.values()))[3] * 1000))
+
+    def _forget(self, job_id):
+        running = bool(self._jobs) and next(iter(self._jobs)) == job_id
+        self._jobs.pop(job_id, None)
+        if running:
+            self._arm()
+
+    def _on_received(self, generation, msg):
+        if generation != self._generation:
+            return
+        self._crashes = 0
+        job_id, ok, payload = msg
+        if job_id not in self._jobs:
+            return  # Cancelled
+        self._forget(job_id)
+        if ok:
+            self.finished.emit(job_id, payload)
+        else:
+            self.failed.emit(job_id, payload)
+
+    def _on_timeout(self):
+        if not self._jobs:
+            return
+        job_id = next(iter(self._jobs))
+        seconds = self._jobs[job_id][3]
+        self._forget(job_id)
+        self.failed.emit(job_id, f"Timed out after {seconds}s")
+        self._restart('timeout')
+
+    def _on_died(self, generation):
+        if generation != self._generation or self._stopping:
+            return
+        # Reap it, exitcode stays None until the dead process has been joined
+        self._process.join(1.0)
+        # The oldest job was the one running when the process crashed, the rest are sent to the new process
+        if self._jobs:
+            job_id = next(iter(self._jobs))
+            self._forget(job_id)
+            self.failed.emit(job_id, f"Worker process exited with code {self._process.exitcode}")
+        self._crashes += 1
+        if self._crashes > self.max_crashes:
+            # Crashing on startup (Eg. a missing dependency), restarting won't help
+            for job_id in list(self._jobs):
+                self._forget(job_id)
+                self.failed.emit(job_id, "Worker process keeps crashing")
+            self._stopping = True
+            self._timer.stop()
+            self._conn.close()
+            return
+        self._restart('crashed')
+
+    def stop(self, wait_seconds=2.0):
+        """Stop the worker process"""
+        self._stopping = True
+        self._jobs.clear()
+        self._timer.stop()
+        try:
+            self._conn.send(None)
+        except OSError:
+            pass
+        self._process.join(wait_seconds)
+        if self._process.is_alive():
+            self._process.terminate()
+        self._conn.close()
+
+
+class FetchPool(QObject):
+    """One FetchWorker process per account, with signals tagged by account key"""
+    finished = pyqtSignal(str, int, object)  # account key, job id, result
+    failed = pyqtSignal(str, int, str)  # account key, job id, error
+
+    def __init__(self, timeout=60.0, parent=None):
+        super().__init__(parent)
+        self.timeout = timeout
+        self.workers = {}
+
+    def add(self, key, schoolSubdomain, cookie, **options):
+        """
+        Start a worker process for an account
+        :param key: Name for the account, used in signals
+        :return: FetchWorker
+        """
+        worker = FetchWorker(schoolSubdomain, cookie, timeout=options.pop('timeout', self.timeout), parent=self, **options)
+        worker.finished.connect(lambda job_id, result: self.finished.emit(key, job_id, result))
+        worker.failed.connect(lambda job_id, error: self.failed.emit(key, job_id, error))
+        self.workers[key] = worker
+        return worker
+
+    def submit(self, key, func, *args, **kwargs):
+        return self.workers[key].submit(func, *args, **kwargs)
+
+    def cancel(self, key, job_id, terminate=False):
+        self.workers[key].cancel(job_id, terminate)
+
+    def remove(self, key):
+        self.workers.pop(key).stop()
+
+    def stop(self):
+        for worker in self.workers.values():
+            worker.stop()
+        self.workers.clear()
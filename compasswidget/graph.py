@@ -1,194 +1,371 @@
-from PyQt6.QtWidgets import QApplication, QWidget
-from PyQt6.QtGui import QPainter, QPen, QColor, QFont
-from PyQt6.QtCore import Qt, QRectF
-from win32mica import ApplyMica, MicaTheme, MicaStyle
-import datetime
-class Event:
-    def __init__(self, name, start_hour, end_hour, color=QColor(50, 100, 255, 150), border_color=QColor(0, 0, 0), secondary_text=""):
-        self.name = name
-        self.start_hour = self.convert_time_to_float(start_hour)
-        self.end_hour = self.convert_time_to_float(end_hour)
-        self.color = color
-        self.border_color = border_color
-        self.secondary_text = secondary_text
-        self.column = 0
-        self.total_columns = 1
-
-    @staticmethod
-    def convert_time_to_float(time_str):
-        dt = datetime.strptime(time_str, "%I:%M %p")  
-        return dt.hour + dt.minute / 60  
-
-class TimelineGraph(QWidget):
-    def __init__(self, events, h_padding=10):
-        super().__init__()
-        ApplyMica(self.winId(), MicaTheme.DARK, MicaStyle.DEFAULT)
-        self.setAttribute(Qt.WidgetAttribute.WA_TranslucentBackground)
-        self.events = events
-        self.h_padding = h_padding
-        self.setMinimumSize(600, 400)
-
-    def calculate_event_layout(self):
-        time_slots = {}  
-        
-        # Scan for every half-hour interval
-        time_step = 0.5  # Increments by 30 minutes
-        current_time = 8.0  # Start at 8 AM
-        end_time = 17.0  # End at 5 PM
-
-        while current_time <= end_time:
-            time_slots[current_time] = [
-                ev for ev in self.events if ev.start_hour <= current_time < ev.end_hour
-            ]
-            current_time += time_step
-
-        # Determine max overlapping events at any point
-        max_columns = max(len(events) for events in time_slots.values())
-
-        # Assign columns dynamically
-        assigned_columns = {}
-        for time, active_events in time_slots.items():
-            available_columns = set(range(max_columns))
-
-            for ev in active_events:
-                if ev not in assigned_columns:
-                    # Find first available column
-                    ev.column = next(i for i in available_columns if i not in [assigned_columns.get(e) for e in active_events])
-                    assigned_columns[ev] = ev.column
-                else:
-                    ev.column = assigned_columns[ev]
-
-        for ev in self.events:
-            ev.total_columns = max_columns
-
-    def paintEvent(self, event):
-        self.calculate_event_layout()
-
-        painter = QPainter(self)
-        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
-
-        bg_color = QColor(255,255,255,0)
-        grid_color = QColor(150, 150, 150)
-        text_color = QColor(250, 250, 250)
-
-        painter.fillRect(self.rect(), bg_color)
-
-        margin = 50
-        timeline_top = margin
-        timeline_height = self.height() - 2 * margin
-        timeline_width = self.width() - 2 * margin
-        hour_step = timeline_height / 9
-
-        pen = QPen(grid_color)
-        pen.setWidth(1)
-        painter.setPen(pen)
-        font = QFont("Arial", 10)
-        painter.setFont(font)
-
-        for i in range(10):
-            y = int(timeline_top + i * hour_step)
-            painter.drawLine(margin, y, self.width() - margin, y)
-
-            hour_label = f"{8 + i}:00"
-            painter.setPen(text_color)
-            painter.drawText(10, y - 5, hour_label)
-            painter.setPen(grid_color)
-
-            if i < 12:
-                dotted_pen = QPen(grid_color, 1, Qt.PenStyle.DotLine)
-                painter.setPen(dotted_pen)
-                half_y = int(y + hour_step / 2)
-                painter.drawLine(margin, half_y, self.width() - margin, half_y)
-                painter.setPen(grid_color)
-
-        v_padding = 0
-        for ev in self.events:
-            y_start = int(timeline_top + (ev.start_hour - 8) * hour_step) + v_padding
-            y_end = int(timeline_top + (ev.end_hour - 8) * hour_step) - v_padding
-            event_height = max(11, y_end - y_start) 
-
-            # Adjust width and spacing for overlapping events
-            column_width = (timeline_width - 10) / ev.total_columns
-            x_start = int(margin + ev.column * column_width + self.h_padding)
-            event_width = int(column_width - self.h_padding * 2)
-
-            # Fill event rectangle
-            painter.fillRect(QRectF(x_start, y_start, event_width, event_height), ev.color)
-            
-            border_pen = QPen(ev.border_color)
-            border_pen.setWidth(1)
-            painter.setPen(border_pen)
-            painter.drawRect(QRectF(x_start, y_start, event_width, event_height))
-            
-            # Draw event text
-            painter.setPen(Qt.GlobalColor.black)
-            painter.drawText(x_start + 5, y_start + 15, ev.name)
-            
-            # Draw secondary text
-            painter.setPen(Qt.GlobalColor.white)
-            painter.drawText(x_start + 5, y_start + 30, ev.secondary_text)
-
-        painter.end()
-
-
-
-
-from compasspy.client import Compass
-import time
-from datetime import datetime
-import re
-#NOTE - Init Client
-
-client = Compass()
-client.login()
-
-def get_teacher_name(teachers, code):
-    for teacher in teachers:
-        if teacher.displayCode == code:
-            return teacher.n  # Full name
-    return None
-
-def get_teacher_code(teachers,backup=None):
-    for i in [teacher.displayCode for teacher in teachers]:
-        if i in backup:
-            if bool(re.search(rf'(^|\W){re.escape(i)}(\W|$)', backup)):
-                return get_teacher_name(teachers,i)
-
-    return None
-
-locations = [['12SC', '12SC'], ['APA', 'APA'], ['APC', 'APC'], ['APPC', 'APPC'], ['AR01', 'AR1'], ['AR02', 'AR2'], ['CA01', 'CA1'], ['CA03', 'CA3'], ['CAPA', 'CAPAT'], ['CHPL', 'CHPL'], ['DAN1', 'DAN1'], ['FT01', 'FT1'], ['FT02', 'FT2'], ['GH', 'GH'], ['GT', 'GT'], ['LHTF', 'LHYTLTF'], ['LHTM', 'LHYTLTM'], ['LH01', 'LH1'], ['LH02', 'LH2'], ['LH03', 'LH3'], ['LH04', 'LH4'], ['LH05', 'LH5'], ['LH06', 'LH6'], ['LH07', 'LH7'], ['LHBO', 'LHBO'], ['LIB1', 'LIB1'], ['LIB2', 'LIB2'], ['LIB3', 'LIB3'], ['LIBS', 'LIBST11'], ['LIBS', 'LIBST12'], ['MC01', 'MC1'], ['MC02', 'MC2'], ['MC03', 'MC3'], ['MC04', 'MC4'], ['MC05', 'MC5'], ['MC06', 'MC6'], ['MC07', 'MC7'], ['MC08', 'MC8'], ['MC09', 'MC9'], ['MCBO', 'MCBO'], ['MEET', 'MEET'], ['METF', 'METTLTF'], ['METM', 'METTLTM'], ['MET01', 'MET1'], ['MET02', 'MET2'], ['MET03', 'MET3'], ['MET04', 'MET4'], ['MET05', 'MET5'], ['MET06', 'MET6'], ['MET07', 'MET7'], ['MET08', 'MET8'], ['MET09', 'MET9'], ['MTSR', 'METSR'], ['MT10', 'MT10'], ['MT11', 'MT11'], ['MT12', 'MT12'], ['MT13', 'MT13'], ['MT14', 'MT14'], ['MU01', 'MU1'], ['MU02', 'MU2'], ['MU03', 'MU3'], ['OFCA', 'OFFCAMP'], ['OLC1', 'OLC1'], ['OLC2', 'OLC2'], ['OLC3', 'OLC3'], ['OLC4', 'OLC4'], ['OLC5', 'OLC5'], ['OLC6', 'OLC6'], ['PSTA', 'PAST'], ['PILB', 'PILAB'], ['PRIN', 'PRIN'], ['PWL1', 'PWL1'], ['PWL2', 'PWL2'], ['QDTF', 'QDTLTF'], ['QDTM', 'QDTLTM'], ['SH01', 'SH1'], ['SH02', 'SH2'], ['SH03', 'SH3'], ['SH04', 'SH4'], ['SL01', 'SL'], ['TM01', 'TM1'], ['TPT1', 'TPass'], ['TTC1', 'TTC01'], ['TTC2', 'TTC02'], ['TTC3', 'TTC03'], ['TTC4', 'TTCO4'], ['TW01', 'TW1'], ['TW02', 'TW2'], ['TX01', 'TX1'], ['TX02', 'TX2'], ['UNA', 'UNASSIGNED'], ['VHO', 'VHO'], ['VIL2', 'VIL2']]
-
-
-timetableRaw = client.getTimetable("7/02/2025")
-teacherlist= client.getStaff()
-rooms = client.getLocations()
-timetableUnsorted = []
-for i in timetableRaw['d']['data']:
-    timetableUnsorted.append({
-        "Running":True if i['runningStatus'] == 1 else False,
-        "title": re.search(r"\((.*?)\)", i["topAndBottomLine"]).group(1) if re.search(r"\((.*?)\)", i["topAndBottomLine"]) else i["topAndBottomLine"],
-        "TopLineInfo": i['topAndBottomLine'],
-        "short_title": i["topTitleLine"],
-        "start": i["start"].split(" - ")[1],
-        "finish": i['finish'].split(" - ")[1],
-        "all_day?": i["allDay"],
-        "teacher": get_teacher_code(teacherlist,i["topAndBottomLine"]),
-        "room": next((room.n for room in rooms if re.search(rf'(^|\W){re.escape(room.n)}(\W|$)', i["topAndBottomLine"])), "NA")
-    })
-timetable = sorted(
-    timetableUnsorted,
-    key=lambda d: time.strptime(d["start"], "%I:%M %p"),
-)
-
-# Print the sorted timetable
-for entry in timetable:
-    formatted_start = time.strftime("%I:%M %p", time.strptime(entry["start"], "%I:%M %p"))
-    entry["start"] = formatted_start
-
-
-events=[Event(i["title"],i["start"],i['finish'],QColor(200, 50, 50, 150),QColor(255,0,0),f"") for i in timetable]
-
-app = QApplication([])
-window = TimelineGraph(events, h_padding=3)
-window.show()
-app.exec()
+from PyQt6.QtWidgets import QApplication, QWidget
+from PyQt6.QtGui import QPainter, QPen, QColor, QFont, QPixmap, QImage
+from PyQt6.QtCore import Qt, QRectF, QEvent, QSize, QRect
+try:
+    from win32mica import ApplyMica, MicaTheme, MicaStyle
+except ImportError:  # Not on Windows (Eg. rendering images on a server), no Mica backdrop
+    ApplyMica = None
+from collections import deque
+from contextlib import contextmanager
+import math
+import time
+import numpy as np
+from eventstore import EventStore
+
+class Event:
+    def __init__(self, name, start_hour, end_hour, color=QColor(50, 100, 255, 150), border_color=QColor(0, 0, 0), secondary_text="", day=None):
+        # Times are minutes since midnight (Lesson.start / finish), "9:00 AM" strings still work
+        self.name = name
+        self.start_hour = self.convert_time_to_float(start_hour)
+        self.end_hour = self.convert_time_to_float(end_hour)
+        self.color = color
+        self.border_color = border_color
+        self.secondary_text = secondary_text
+        self.day = day  # date, for multi day views (None = the only day)
+        self.column = 0
+        self.total_columns = 1
+
+    @classmethod
+    def from_lesson(cls, lesson, color=QColor(50, 100, 255, 150), border_color=QColor(0, 0, 0), secondary_text=""):
+        return cls(lesson.title, lesson.start, lesson.finish, color, border_color, secondary_text, lesson.day)
+
+    @staticmethod
+    def convert_time_to_float(time_str):
+        if isinstance(time_str, int):
+            return time_str / 60
+        # "9:00 AM", parsed by hand, strptime is slow enough to show up with thousands of events
+        clock, _, meridiem = time_str.strip().partition(' ')
+        hour, minute = clock.split(':')
+        return int(hour) % 12 + (12 if meridiem.upper() == 'PM' else 0) + int(minute) / 60  
+
+
+class TimelineGraph(QWidget):
+    margin = 50
+    header = 20  # Room for day names above the grid in multi day views
+    text_line = 15  # Event height (px) a line of text needs, smaller events are drawn without it
+    text_width = 20
+
+    def __init__(self, events, h_padding=10, cache_background=True, start_hour=8, end_hour=17, days=None, visible_days=1, visible_hours=None, mica=True):
+        """
+        :param events: Event list, or an EventStore (Eg. EventStore.from_lessons) for big timetables
+        :param start_hour / end_hour: Time range that can be scrolled through
+        :param days: Day columns (dates), Default: every day an event is on (or one column for undated events)
+        :param visible_days: Day columns on screen at once, shift + wheel scrolls through the rest
+        :param visible_hours: Hours on screen at once (zoom, ctrl + wheel), Default: the whole range
+        :param mica: Mica backdrop on Windows, False for a graph that's only rendered to images (no native window)
+        """
+        super().__init__()
+        if mica and ApplyMica is not None:
+            ApplyMica(self.winId(), MicaTheme.DARK, MicaStyle.DEFAULT)
+        self.setAttribute(Qt.WidgetAttribute.WA_TranslucentBackground)
+        self.h_padding = h_padding
+        self.setMinimumSize(600, 400)
+
+        # Viewport: which hours and day columns are on screen
+        self.start_hour = start_hour
+        self.end_hour = end_hour
+        self.view_hours = min(visible_hours or end_hour - start_hour, end_hour - start_hour)
+        self.view_start = start_hour
+        self.visible_days = visible_days
+        self.day_offset = 0
+        self._days = days
+
+        # The grid and hour labels only change when the viewport does, they're drawn once into a pixmap at the
+        # screen's device pixel ratio and blitted, until a resize / scroll / screen (DPI) change / theme change
+        self.cache_background = cache_background
+        self._background = None
+        self._background_key = None
+        self.grid_color = QColor(150, 150, 150)
+        self.text_color = QColor(250, 250, 250)
+        self._grid_pen = QPen(self.grid_color, 1)
+        self._dotted_pen = QPen(self.grid_color, 1, Qt.PenStyle.DotLine)
+        self._font = QFont("Arial", 10)
+        self._border_pen = QPen(QColor(0, 0, 0), 1)
+        self.paint_times = deque(maxlen=120)  # ms, most recent paints
+        self._screen_hooked = False
+        self.set_events(events)
+
+    def set_events(self, events):
+        # Layout only depends on the events, not on the size, so the store does it once here and not per paint
+        self.events = events
+        self.store = events if isinstance(events, EventStore) else EventStore.from_events(events)
+        self.days = list(self._days) if self._days is not None else (self.store.days or [None])
+        self.day_offset = min(self.day_offset, max(0, len(self.days) - self.visible_days))
+        self._background = None
+        self.update()
+
+    # Viewport
+    @property
+    def multi_day(self):
+        return self.days != [None]
+
+    def _top(self):
+        return self.margin + (self.header if self.multi_day else 0)
+
+    def hour_step(self):
+        return (self.height() - self._top() - self.margin) / self.view_hours
+
+    def y_at(self, hour):
+        return self._top() + (hour - self.view_start) * self.hour_step()
+
+    def hour_at(self, y):
+        return self.view_start + (y - self._top()) / self.hour_step()
+
+    def day_width(self):
+        return (self.width() - 2 * self.margin) / self.visible_days
+
+    def visible_day_columns(self):
+        return self.days[self.day_offset:self.day_offset + self.visible_days]
+
+    def scroll_to(self, hour=None, day=None):
+        """Put hour at the top of the view and / or day in the first column"""
+        if hour is not None:
+            self.view_start = min(max(self.start_hour, hour), self.end_hour - self.view_hours)
+        if day is not None and day in self.days:
+            self.day_offset = min(self.days.index(day), max(0, len(self.days) - self.visible_days))
+        self.update()
+
+    def set_zoom(self, hours, anchor=None):
+        """Show this many hours at once, keeping anchor (an hour, Default: the middle) where it is on screen"""
+        hours = min(max(1.0, hours), self.end_hour - self.start_hour)
+        if anchor is None:
+            anchor = self.view_start + self.view_hours / 2
+        share = (anchor - self.view_start) / self.view_hours
+        self.view_hours = hours
+        self.scroll_to(hour=anchor - share * hours)
+
+    def wheelEvent(self, event):
+        delta = event.angleDelta()
+        modifiers = event.modifiers()
+        if modifiers & Qt.KeyboardModifier.ControlModifier:
+            self.set_zoom(self.view_hours * 0.8 ** (delta.y() / 120), self.hour_at(event.position().y()))
+        elif modifiers & Qt.KeyboardModifier.ShiftModifier or delta.x():
+            steps = -round((delta.x() or delta.y()) / 120)
+            self.day_offset = min(max(0, self.day_offset + steps), max(0, len(self.days) - self.visible_days))
+            self.update()
+        else:
+            self.scroll_to(hour=self.view_start - delta.y() / 120 * 0.5)
+        event.accept()
+
+    def draw_background(self, painter):
+        """Hour grid, half hour dotted lines, hour labels and (multi day) day names"""
+        margin = self.margin
+        hour_step = self.hour_step()
+        left, right = margin, self.width() - margin
+
+        painter.setFont(self._font)
+        hour = math.ceil(self.view_start - 1e-9)  # First whole hour in view
+        if hour - 0.5 >= self.view_start:
+            painter.setPen(self._dotted_pen)
+            half_y = int(self.y_at(hour - 0.5))
+            painter.drawLine(left, half_y, right, half_y)
+        while hour <= self.view_start + self.view_hours + 1e-9:
+            y = int(self.y_at(hour))
+            painter.setPen(self._grid_pen)
+            painter.drawLine(left, y, right, y)
+
+            hour_label = f"{hour}:00"
+            painter.setPen(self.text_color)
+            painter.drawText(10, y - 5, hour_label)
+
+            painter.setPen(self._dotted_pen)
+            half_y = int(y + hour_step / 2)
+            painter.drawLine(left, half_y, right, half_y)
+            hour += 1
+
+        if self.multi_day:
+            width = self.day_width()
+            for i, day in enumerate(self.visible_day_columns()):
+                x = int(margin + i * width)
+                painter.setPen(self.text_color)
+                painter.drawText(x + 5, margin, day.strftime("%a %d/%m"))
+                if i:
+                    painter.setPen(self._grid_pen)
+                    painter.drawLine(x, self._top(), x, self.height() - margin)
+
+    def background(self):
+        """Cached background layer, rendered again if the size, device pixel ratio or viewport changed"""
+        ratio = self.devicePixelRatioF()
+        key = (self.size(), ratio, self.view_start, self.view_hours, self.day_offset, self.visible_days)
+        if self._background is None or self._background_key != key:
+            pixmap = QPixmap(int(self.width() * ratio), int(self.height() * ratio))
+            pixmap.setDevicePixelRatio(ratio)
+            pixmap.fill(Qt.GlobalColor.transparent)
+            painter = QPainter(pixmap)
+            painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+            self.draw_background(painter)
+            painter.end()
+            self._background = pixmap
+            self._background_key = key
+        return self._background
+
+    def invalidate_background(self):
+        self._background = None
+        self.update()
+
+    def resizeEvent(self, event):
+        self._background = None
+        super().resizeEvent(event)
+
+    def changeEvent(self, event):
+        if event.type() in (QEvent.Type.PaletteChange, QEvent.Type.StyleChange, QEvent.Type.ThemeChange):
+            self._background = None
+        super().changeEvent(event)
+
+    def showEvent(self, event):
+        # Moving to another screen can change the DPI without a resize
+        handle = self.windowHandle()
+        if handle is not None and not self._screen_hooked:
+            handle.screenChanged.connect(lambda screen: self.invalidate_background())
+            self._screen_hooked = True
+        super().showEvent(event)
+
+    def visible_events(self, rect=None):
+        """(event indexes into self.store, day column of each) that can touch rect (Default: the whole view)"""
+        rect = rect or self.rect()
+        hour_step = self.hour_step()
+        # Events are drawn at least 11px tall with text under the top edge, so look a little above the rect
+        start = max(self.view_start, self.hour_at(rect.top()) - 32 / hour_step)
+        end = min(self.view_start + self.view_hours, self.hour_at(rect.bottom() + 1))
+        width = self.day_width()
+        first = max(0, int((rect.left() - self.margin) // width))
+        last = int((rect.right() - self.margin) // width)
+        indexes = []
+        columns = []
+        for i, day in enumerate(self.visible_day_columns()):
+            if first <= i <= last:
+                index = self.store.visible(day, start, end)
+                indexes.append(index)
+                columns.append(np.full(len(index), i))
+        if not indexes:
+            return np.empty(0, dtype=int), np.empty(0, dtype=int)
+        return np.concatenate(indexes), np.concatenate(columns)
+
+    def paintEvent(self, event):
+        started = time.perf_counter()
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+
+        margin = self.margin
+        day_width = self.day_width()
+
+        if self.cache_background:
+            painter.drawPixmap(0, 0, self.background())
+        else:
+            self.draw_background(painter)
+        painter.setFont(self._font)
+        # Events scrolled partly out of view are cut at the grid, not drawn over the labels
+        painter.setClipRect(QRectF(0, self._top(), self.width(), self.height() - self._top() - margin).intersected(QRectF(event.rect())))
+
+        # Every visible rectangle in one go, then cull what's empty or outside the exposed area before building any QRect
+        store = self.store
+        index, day_columns = self.visible_events(event.rect())
+        x, y, w, h = store.rects(index, margin + day_columns * day_width, self._top(), self.view_start, self.hour_step(), day_width, self.h_padding)
+        clip = painter.clipBoundingRect()
+        keep = (w > 0) & (x <= clip.right()) & (x + w >= clip.left()) & (y <= clip.bottom()) & (y + h >= clip.top())
+        index, x, y, w, h = index[keep], x[keep], y[keep], w[keep], h[keep]
+        color = store.color[index]
+        palette = store.palette
+
+        # Fill and border are one drawRects per palette colour rather than two calls per event
+        # The boxes sit on whole pixels, so antialiasing them only blurs the borders and costs most of the frame
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing, False)
+        for c in np.unique(color).tolist():
+            fill, border = palette[c]
+            painter.setBrush(fill)
+            self._border_pen.setColor(border)
+            painter.setPen(self._border_pen)
+            painter.drawRects(self._qrects(color == c, x, y, w, h))
+        painter.setBrush(Qt.BrushStyle.NoBrush)
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+
+        # Text only where it fits: the name needs a line, the secondary text a second one
+        named = (h >= self.text_line) & (w >= self.text_width)
+        painter.setPen(Qt.GlobalColor.black)
+        for i, x_start, y_start in zip(index[named].tolist(), x[named].tolist(), y[named].tolist()):
+            painter.drawText(x_start + 5, y_start + 15, store.name[i])
+        painter.setPen(Qt.GlobalColor.white)
+        second = named & (h >= self.text_line * 2)
+        for i, x_start, y_start in zip(index[second].tolist(), x[second].tolist(), y[second].tolist()):
+            if store.secondary[i]:
+                painter.drawText(x_start + 5, y_start + 30, store.secondary[i])
+
+        painter.end()
+        self.paint_times.append((time.perf_counter() - started) * 1000)
+
+    @staticmethod
+    def _qrects(mask, x, y, w, h):
+        return list(map(QRect, x[mask].tolist(), y[mask].tolist(), w[mask].tolist(), h[mask].tolist()))
+
+    # Offscreen rendering, nothing has to be shown so it works headless (QT_QPA_PLATFORM=offscreen)
+    # The Mica backdrop isn't there in an image, so the background colour stands in for it
+    @contextmanager
+    def _sized(self, width, height):
+        # The window's minimum size would otherwise clamp the layout, and a smaller image would only get its corner
+        minimum = self.minimumSize()
+        self.setMinimumSize(0, 0)
+        self.resize(width, height)
+        try:
+            yield
+        finally:
+            self.setMinimumSize(minimum)
+
+    def render_image(self, width=600, height=800, ratio=1.0, background=QColor(32, 32, 32)):
+        """
+        Draw the graph into a QImage
+        :param ratio: Device pixel ratio, Eg. 2 for an image twice the size with the same layout
+        :param background: Fill behind the graph, None for transparent
+        """
+        image = QImage(int(width * ratio), int(height * ratio), QImage.Format.Format_ARGB32_Premultiplied)
+        image.setDevicePixelRatio(ratio)
+        image.fill(background if background is not None else Qt.GlobalColor.transparent)
+        with self._sized(width, height):
+            self.render(image)
+        return image
+
+    def save_svg(self, path, width=600, height=800, background=QColor(32, 32, 32)):
+        """Draw the graph as an SVG, with the grid as vectors rather than the cached pixmap"""
+        from PyQt6.QtSvg import QSvgGenerator
+
+        generator = QSvgGenerator()
+        generator.setFileName(path)
+        generator.setSize(QSize(width, height))
+        generator.setViewBox(QRect(0, 0, width, height))
+        painter = QPainter(generator)
+        if background is not None:
+            painter.fillRect(0, 0, width, height, background)
+        cache, self.cache_background = self.cache_background, False
+        try:
+            with self._sized(width, height):
+                self.render(painter)
+        finally:
+            self.cache_background = cache
+            painter.end()
+
+    def save_image(self, path, width=600, height=800, ratio=1.0, background=QColor(32, 32, 32), quality=-1):
+        """
+        Render to a file, the format comes from the extension (.png, .jpg, .svg, ...)
+        :param quality: 0-100 as QImage.save takes it, for PNG higher is less compression (faster to write)
+        """
+        if path.lower().endswith('.svg'):
+            return self.save_svg(path, width, height, background)
+        if not self.render_image(width, height, ratio, background).save(path, None, quality):
+            raise OSError(f"Couldn't write {path}")
+
+
+if __name__ == '__main__':
+    import asyncio
+    from compasspy.asyncclient import AsyncCompass
+    from compasspy.cache import CompassCache
+    from compasspy.clearance import ClearanceStore
+    from timetable import fetch_timetable
+
+    client = AsyncCompass('prefix', 'cookie', cache=CompassCache(), clearance=ClearanceStore())
+    timetable = asyncio.run(fetch_timetable(client, "7/02/2025"))
+
+    events=[Event.from_lesson(i,QColor(200, 50, 50, 150),QColor(255,0,0),"") for i in timetable]
+
+    app = QApplication([])
+    window = TimelineGraph(events, h_padding=3)
+    window.show()
+    app.exec()
@@ -0,0 +1,124 @@
+import re
+from datetime import date
+
+# Normalised lesson records
+# GetScheduleLinesForDate rows are parsed exactly once into slotted Lesson records with start / finish as
+# minutes since midnight, so the widget, the graph and the current / next lookup never parse strings again.
+
+_TITLE = re.compile(r"\((.*?)\)")
+
+
+def parse_clock(text):
+    """'9:05 am' (or 'dd/mm/YYYY - 9:05 am') -> minutes since midnight"""
+    if " - " in text:
+        text = text.rsplit(" - ", 1)[1]
+    clock, _, suffix = text.strip().partition(" ")
+    hours, _, minutes = clock.partition(":")
+    hours, minutes = int(hours), int(minutes or 0)
+    suffix = suffix.lower()
+    if suffix == "pm" and hours != 12:
+        hours += 12
+    elif suffix == "am" and hours == 12:
+        hours = 0
+    return hours * 60 + minutes
+
+
+def parse_day(text):
+    """'dd/mm/YYYY - 9:05 am' -> date"""
+    day, month, year = text.split(" - ", 1)[0].strip().split("/")
+    return date(int(year), int(month), int(day))
+
+
+def format_clock(minutes):
+    """Minutes since midnight -> '09:05 AM', the format the widget has always shown"""
+    hours, minutes = divmod(minutes, 60)
+    return f"{(hours % 12) or 12:02d}:{minutes:02d} {'AM' if hours < 12 else 'PM'}"
+
+
+class Lesson:
+    __slots__ = ('instance_id', 'activity_id', 'day', 'start', 'finish', 'title', 'short_title', 'line',
+                 'teacher', 'room', 'running_status', 'all_day')
+
+    def __init__(self, instance_id, activity_id, day, start, finish, title, short_title, line, teacher, room, running_status, all_day):
+        self.instance_id = instance_id
+        self.activity_id = activity_id
+        self.day = day  # date
+        self.start = start  # Minutes since midnight
+        self.finish = finish
+        self.title = title
+        self.short_title = short_title
+        self.line = line  # topAndBottomLine, what teacher / room were resolved from
+        self.teacher = teacher
+        self.room = room
+        self.running_status = running_status  # 1 = running, anything else is cancelled / changed
+        self.all_day = all_day
+
+    @property
+    def running(self):
+        return self.running_status == 1
+
+    @property
+    def start_text(self):
+        return format_clock(self.start)
+
+    @property
+    def finish_text(self):
+        return format_clock(self.finish)
+
+    @property
+    def key(self):
+        """Identity of the lesson across refreshes"""
+        return self.instance_id or (self.activity_id, self.day, self.start)
+
+    def to_dict(self):
+        """JSON friendly dict (day as ISO date, start / finish still minutes)"""
+        d = {name: getattr(self, name) for name in self.__slots__}
+        d['day'] = self.day.isoformat()
+        return d
+
+    @classmethod
+    def from_dict(cls, d):
+        """Lesson from to_dict output (Eg. a line of the batch engine's output)"""
+        return cls(**dict(d, day=date.fromisoformat(d['day'])))
+
+    def __repr__(self):
+        return f"Lesson({self.title!r}, {self.day}, {self.start_text}-{self.finish_text}, {self.teacher!r}, {self.room!r})"
+
+
+def lesson_from_row(row, annotator):
+    """One raw GetScheduleLinesForDate row -> Lesson"""
+    line = row["topAndBottomLine"] or ""
+    title = _TITLE.search(line)
+    teacher, room = annotator.annotate(line)
+    return Lesson(
+        row.get("instanceId"),
+        row.get("activityId"),
+        parse_day(row["start"]),
+        parse_clock(row["start"]),
+        parse_clock(row["finish"]),
+        title.group(1) if title else line,
+        row["topTitleLine"],
+        line,
+        teacher,
+        room or "NA",
+        row["runningStatus"],
+        row["allDay"],
+    )
+
+
+def row_key(row):
+    """Lesson.key of a raw row, without building the Lesson"""
+    return row.get("instanceId") or (row.get("activityId"), parse_day(row["start"]), parse_clock(row["start"]))
+
+
+def normalize_lessons(rows, annotator):
+    """
+    Turn raw GetScheduleLinesForDate rows into Lesson records, sorted by day and start time
+    :param rows: timetableRaw['d']['data'] (dicts), or the data of several days
+    :param annotator: LessonAnnotator resolving teacher / room
+    :return: list of Lesson
+    """
+    lessons = [lesson_from_row(i, annotator) for i in rows]
+    lessons.sort(key=lambda l: (l.day, l.start))
+    return lessons
+
@@ -0,0 +1,138 @@
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from PyQt6.QtGui import QColor
+from PyQt6.QtWidgets import QApplication
+from eventstore import EventStore
+from graph import TimelineGraph
+from lessons import Lesson
+
+# Headless timetable images: renders the batch engine's output (batch.py) on a process pool
+# Every worker has its own offscreen QApplication and one TimelineGraph it reuses for all of its images, and
+# is sent chunks of timetables so the pickling overhead is per chunk, not per image.
+#
+# Input: one JSON object per line, {"account": ..., "date": "2025-02-03", "lessons": [Lesson.to_dict(), ...]}
+#   (lines with an "error" are counted and skipped)
+# Output: <account>_<date>.<format> per line, or <account>.<format> with every day of the account side by side (--per account)
+
+_app = None
+_graph = None
+_options = None
+
+
+def _start_worker(options):
+    global _app, _graph, _options
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')  # No display needed
+    _app = QApplication.instance() or QApplication([])
+    _options = options
+    _graph = TimelineGraph([], h_padding=3, start_hour=options['start_hour'], end_hour=options['end_hour'], mica=False)
+
+
+def _filename(text):
+    return re.sub(r'[^\w.-]+', '_', str(text))
+
+
+def render_chunk(chunk):
+    """
+    Render timetables in a worker
+    :param chunk: (name, [Lesson.to_dict()]) list
+    :return: (images written, [error messages])
+    """
+    written = 0
+    errors = []
+    for name, rows in chunk:
+        path = os.path.join(_options['output'], f"{_filename(name)}.{_options['format']}")
+        try:
+            lessons = [Lesson.from_dict(r) for r in rows]
+            store = EventStore.from_lessons(lessons, QColor(200, 50, 50, 150), QColor(255, 0, 0), lambda l: l.room or "")
+            _graph.visible_days = max(1, len(store.days))
+            _graph.set_events(store)
+            _graph.save_image(path, _options['width'] * _graph.visible_days, _options['height'], _options['ratio'], quality=_options['quality'])
+            written += 1
+        except Exception as e:
+            errors.append(f"{name}: {type(e).__name__}: {e}")
+    return written, errors
+
+
+def read_timetables(lines, per='day'):
+    """
+    :param lines: NDJSON lines from batch.py
+    :param per: 'day' for an image per account and day, 'account' for one per account
+    :return: ([(name, lesson dicts)], lines with errors)
+    """
+    timetables = {}
+    errors = 0
+    for line in lines:
+        if not line.strip():
+            continue
+        entry = json.loads(line)
+        if 'error' in entry:
+            errors += 1
+            continue
+        name = entry['account'] if per == 'account' else f"{entry['account']}_{entry['date']}"
+        timetables.setdefault(name, []).extend(entry['lessons'])
+    return list(timetables.items()), errors
+
+
+def run(timetables, output, processes=None, chunk_size=32, format='png', width=600, height=800, ratio=1.0, start_hour=8, end_hour=17, quality=80):
+    """
+    Render timetables on a process pool
+    :param timetables: (name, lesson dicts) list, from read_timetables
+    :param output: Directory for the images
+    :param processes: Worker processes (Default: one per core)
+    :param width: Width per day column
+    :param quality: QImage.save quality, 80 writes PNGs about a third faster than Qt's default for a few KB more
+    :return: {'images', 'errors', 'seconds'}
+    """
+    started = time.perf_counter()
+    os.makedirs(output, exist_ok=True)
+    options = {'output': output, 'format': format, 'width': width, 'height': height, 'ratio': ratio,
+               'start_hour': start_hour, 'end_hour': end_hour, 'quality': quality}
+    chunks = [timetables[i:i + chunk_size] for i in range(0, len(timetables), chunk_size)]
+    stats = {'images': 0, 'errors': 0}
+    with ProcessPoolExecutor(max_workers=processes, initializer=_start_worker, initargs=(options,)) as pool:
+        for written, errors in pool.map(render_chunk, chunks):
+            stats['images'] += written
+            stats['errors'] += len(errors)
+            for error in errors:
+                print(error, file=sys.stderr)
+    stats['seconds'] = time.perf_counter() - started
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render timetable images from batch.py output, without a display")
+    parser.add_argument('timetables', help="NDJSON from batch.py (- for stdin)")
+    parser.add_argument('-o', '--output', default='timetables', help="Directory for the images")
+    parser.add_argument('-f', '--format', default='png', choices=['png', 'jpg', 'svg'])
+    parser.add_argument('-p', '--processes', type=int, default=None, help="Worker processes (Default: one per core)")
+    parser.add_argument('--per', default='day', choices=['day', 'account'], help="An image per account and day, or per account")
+    parser.add_argument('--width', type=int, default=600, help="Pixels per day column")
+    parser.add_argument('--height', type=int, default=800)
+    parser.add_argument('--ratio', type=float, default=1.0, help="Device pixel ratio, 2 for high DPI images")
+    parser.add_argument('--start-hour', type=int, default=8)
+    parser.add_argument('--end-hour', type=int, default=17)
+    parser.add_argument('--quality', type=int, default=80, help="QImage.save quality, -1 for Qt's default")
+    parser.add_argument('--chunk-size', type=int, default=32, help="Timetables sent to a worker at once")
+    args = parser.parse_args(argv)
+
+    source = sys.stdin if args.timetables == '-' else open(args.timetables)
+    try:
+        timetables, skipped = read_timetables(source, args.per)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+    stats = run(timetables, args.output, args.processes, args.chunk_size, args.format, args.width, args.height, args.ratio,
+                args.start_hour, args.end_hour, args.quality)
+    rate = stats['images'] / stats['seconds'] * 60 if stats['seconds'] else 0
+    print(f"{stats['images']} images ({stats['errors']} errors, {skipped} failed fetches skipped) in {stats['seconds']:.2f}s, {rate:.0f}/min",
+          file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+import json
+import os
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from lessons import Lesson
+
+# Last processed timetable, saved locally so the widget can paint it at launch before Compass answers
+# One small JSON file per school: lessons are stored as rows in Lesson slot order, with the day as an ordinal.
+
+VERSION = 1
+
+
+class TimetableSnapshot:
+    def __init__(self, schoolSubdomain, path=None):
+        """
+        :param schoolSubdomain: School the snapshot belongs to (one file each)
+        :param path: Snapshot file (Default: ~/.compasspy/snapshots/<schoolSubdomain>.json)
+        """
+        if path is None:
+            path = os.path.join(os.path.expanduser('~'), '.compasspy', 'snapshots', f'{schoolSubdomain}.json')
+        self.path = path
+
+    def save(self, day, lessons, expires=None):
+        """
+        Replace the snapshot
+        :param day: Day the lessons were fetched for ('d/mm/YYYY', what the widget asks Compass for)
+        :param lessons: Lesson records, annotated
+        :param expires: Unix time after which the snapshot isn't shown (Default: midnight after the last lesson, or tomorrow)
+        """
+        if expires is None:
+            last = max((l.day for l in lessons), default=date.today())
+            expires = datetime.combine(last + timedelta(days=1), datetime.min.time()).timestamp()
+        rows = [[l.instance_id, l.activity_id, l.day.toordinal(), l.start, l.finish, l.title, l.short_title, l.line,
+                 l.teacher, l.room, l.running_status, l.all_day] for l in lessons]
+        data = {'version': VERSION, 'day': day, 'saved': time.time(), 'expires': expires, 'lessons': rows}
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with tempfile.NamedTemporaryFile('w', dir=os.path.dirname(self.path) or '.', prefix=os.path.basename(self.path),
+                                         suffix='.tmp', delete=False) as f:
+            json.dump(data, f, separators=(',', ':'))
+        try:
+            os.replace(f.name, self.path)
+        except OSError:
+            os.remove(f.name)
+            raise
+
+    def load(self, day):
+        """
+        :param day: Day the widget is about to fetch
+        :return: Lesson records from the snapshot, or None if there's no usable snapshot for that day
+        """
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        try:
+            if data.get('version') != VERSION or data.get('day') != day or data['expires'] <= time.time():
+                return None
+            lessons = []
+            for row in data['lessons']:
+                row[2] = date.fromordinal(row[2])
+                lessons.append(Lesson(*row))
+        except (AttributeError, KeyError, TypeError, ValueError):
+            return None  # Written by something else, a fresh fetch replaces it
+        return lessons
+
+    def clear(self):
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
@@ -0,0 +1,182 @@
+import glob
+import json
+import os
+import tempfile
+import threading
+import time
+import numpy as np
+from datetime import date, datetime
+from lessons import Lesson
+
+# Columnar store for a whole term of lessons
+# One fixed width numpy record per lesson, sorted by start, saved as a .npy file that is opened memory-mapped,
+# so any number of widget processes share the same pages and range queries are searchsorted / masks.
+# Subject / teacher / room strings are interned into small id tables.
+#
+# On disk: <path>.<version>.npy holds the rows and is never rewritten, <path> is a small JSON file with the string
+# tables and the version of its rows. Replacing <path> swaps both at once, so a reader never pairs new rows with
+# old strings (an npz would hold both, but can't be memory-mapped).
+
+DTYPE = np.dtype([
+    ('key', '<i4'),  # Absolute start, minutes since 0001-01-01 (date.toordinal() * 1440 + start)
+    ('day', '<i4'),  # date.toordinal()
+    ('start', '<i2'),  # Minutes since midnight
+    ('finish', '<i2'),
+    ('subject', '<i4'),  # Ids into the string tables, -1 for none
+    ('teacher', '<i4'),
+    ('room', '<i4'),
+    ('status', 'i1'),  # runningStatus, 1 = running
+])
+
+
+def _key(when):
+    """datetime / date -> absolute minute"""
+    if isinstance(when, datetime):
+        return when.toordinal() * 1440 + when.hour * 60 + when.minute
+    return when.toordinal() * 1440
+
+
+def _replace(path, mode, write):
+    # Write a unique temp file next to path, then move it over path in one step
+    with tempfile.NamedTemporaryFile(mode, dir=os.path.dirname(path) or '.', prefix=os.path.basename(path), suffix='.tmp',
+                                     delete=False) as f:
+        write(f)
+    try:
+        os.replace(f.name, path)
+    except OSError:
+        os.remove(f.name)
+        raise
+
+
+class TermStore:
+    def __init__(self, rows, subjects, teachers, rooms):
+        self.rows = rows
+        self.subjects = subjects
+        self.teachers = teachers
+        self.rooms = rooms
+        self._ids = [{s: i for i, s in enumerate(table)} for table in (subjects, teachers, rooms)]
+
+    @classmethod
+    def build(cls, lessons):
+        """Lesson records (any number of days) -> TermStore"""
+        tables = ([], [], [])
+        ids = ({}, {}, {})
+
+        def intern(n, text):
+            if text is None:
+                return -1
+            i = ids[n].get(text)
+            if i is None:
+                i = ids[n][text] = len(tables[n])
+                tables[n].append(text)
+            return i
+
+        rows = np.empty(len(lessons), DTYPE)
+        for n, l in enumerate(lessons):
+            day = l.day.toordinal()
+            rows[n] = (day * 1440 + l.start, day, l.start, l.finish,
+                       intern(0, l.title), intern(1, l.teacher), intern(2, l.room), l.running_status)
+        rows.sort(order=['key', 'finish'], kind='stable')
+        return cls(rows, *tables)
+
+    def save(self, path):
+        """Write <path>.<version>.npy and point <path> at it, replacing the previous save atomically"""
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        version = f'{time.time_ns():x}-{os.getpid()}-{threading.get_ident():x}'
+        rows = f'{path}.{version}.npy'
+        _replace(rows, 'wb', lambda f: np.save(f, self.rows))
+        _replace(path, 'w', lambda f: json.dump({'version': version, 'subjects': self.subjects, 'teachers': self.teachers,
+                                                 'rooms': self.rooms}, f, separators=(',', ':')))
+        # Older rows aren't read by new opens any more (still mapped ones can't be removed on Windows, that's fine)
+        # Only older ones: a newer file may be another process' save that hasn't replaced <path> yet
+        for old in glob.glob(glob.escape(path) + '.*.npy'):
+            stamp = old[len(path) + 1:].split('-')[0]
+            try:
+                if int(stamp, 16) < int(version.split('-')[0], 16):
+                    os.remove(old)
+            except (ValueError, OSError):
+                pass
+
+    @classmethod
+    def open(cls, path):
+        """Open a saved store memory-mapped (read only, nothing is copied until it's touched)"""
+        for attempt in range(3):
+            with open(path) as f:
+                saved = json.load(f)
+            try:
+                rows = np.load(f"{path}.{saved['version']}.npy", mmap_mode='r')
+            except FileNotFoundError:
+                if attempt == 2:
+                    raise
+                continue  # Replaced by a newer save (and cleaned up) between the two reads
+            return cls(rows, saved['subjects'], saved['teachers'], saved['rooms'])
+
+    def __len__(self):
+        return len(self.rows)
+
+    def id(self, table, text):
+        """Id of a subject / teacher / room, or -1 if it never appears"""
+        return self._ids[('subjects', 'teachers', 'rooms').index(table)].get(text, -1)
+
+    def lesson(self, row):
+        """A row (or its index) back as a Lesson, for display"""
+        if not isinstance(row, np.void):
+            row = self.rows[row]
+        return Lesson(None, None, date.fromordinal(int(row['day'])), int(row['start']), int(row['finish']),
+                      self.subjects[row['subject']] if row['subject'] >= 0 else None, None, None,
+                      self.teachers[row['teacher']] if row['teacher'] >= 0 else None,
+                      self.rooms[row['room']] if row['room'] >= 0 else None, int(row['status']), False)
+
+    def between(self, start, end):
+        """Rows starting in [start, end) (date or datetime), a view, not a copy"""
+        lo, hi = np.searchsorted(self.rows['key'], [_key(start), _key(end)])
+        return self.rows[lo:hi]
+
+    def on(self, day):
+        """Rows of one day"""
+        first = day.toordinal() * 1440
+        lo, hi = np.searchsorted(self.rows['key'], [first, first + 1440])
+        return self.rows[lo:hi]
+
+    def free_periods(self, day, day_start=8 * 60, day_end=15 * 60 + 30, minimum=1):
+        """
+        Gaps between running lessons on a day
+        :param day_start: Minutes since midnight the school day starts
+        :param day_end: Minutes since midnight it ends
+        :param minimum: Shortest gap worth returning, minutes
+        :return: int array of [start, finish] minute pairs
+        """
+        rows = self.on(day)
+        rows = rows[rows['status'] == 1]
+        starts = np.append(rows['start'].astype(np.int32), day_end)
+        # Latest finish so far, so overlapping lessons don't open a fake gap
+        ends = np.maximum.accumulate(np.insert(rows['finish'].astype(np.int32), 0, day_start))
+        gaps = np.column_stack([ends, np.minimum(starts, day_end)])
+        return gaps[gaps[:, 1] - gaps[:, 0] >= minimum]
+
+    def room_occupancy(self, room, start, end):
+        """
+        Running lessons in a room between start and end (date or datetime)
+        :return: Rows, Eg. occupancy['finish'] - occupancy['start'] for minutes booked
+        """
+        rows = self.between(start, end)
+        i = self.id('rooms', room)
+        return rows[(rows['room'] == i) & (rows['status'] == 1) & (i >= 0)]
+
+    def next_with(self, when, teacher=None, subject=None, room=None):
+        """
+        First running lesson starting after when (datetime) matching every given field
+        :return: Row, or None
+        """
+        lo = np.searchsorted(self.rows['key'], _key(when), side='right')
+        rows = self.rows[lo:]
+        mask = rows['status'] == 1
+        for field, table, text in (('teacher', 'teachers', teacher), ('subject', 'subjects', subject), ('room', 'rooms', room)):
+            if text is not None:
+                i = self.id(table, text)
+                if i < 0:
+                    return None  # Never appears (and -1 means "none" in the columns)
+                mask &= rows[field] == i
+        hits = np.flatnonzero(mask)
+        return rows[hits[0]] if len(hits) else None
@@ -0,0 +1,51 @@
+from compasspy.asyncclient import AsyncCompass
+from annotator import LessonAnnotator
+from lessons import normalize_lessons
+from changefeed import ChangeFeed
+
+# Timetable processing shared by the widgets and the fetch worker process
+# Nothing here runs at import time so worker processes can import it cheaply
+
+# Room aliases: [Compass room code, other spelling used in lesson lines]
+locations = [['12SC', '12SC'], ['APA', 'APA'], ['APC', 'APC'], ['APPC', 'APPC'], ['AR01', 'AR1'], ['AR02', 'AR2'], ['CA01', 'CA1'], ['CA03', 'CA3'], ['CAPA', 'CAPAT'], ['CHPL', 'CHPL'], ['DAN1', 'DAN1'], ['FT01', 'FT1'], ['FT02', 'FT2'], ['GH', 'GH'], ['GT', 'GT'], ['LHTF', 'LHYTLTF'], ['LHTM', 'LHYTLTM'], ['LH01', 'LH1'], ['LH02', 'LH2'], ['LH03', 'LH3'], ['LH04', 'LH4'], ['LH05', 'LH5'], ['LH06', 'LH6'], ['LH07', 'LH7'], ['LHBO', 'LHBO'], ['LIB1', 'LIB1'], ['LIB2', 'LIB2'], ['LIB3', 'LIB3'], ['LIBS', 'LIBST11'], ['LIBS', 'LIBST12'], ['MC01', 'MC1'], ['MC02', 'MC2'], ['MC03', 'MC3'], ['MC04', 'MC4'], ['MC05', 'MC5'], ['MC06', 'MC6'], ['MC07', 'MC7'], ['MC08', 'MC8'], ['MC09', 'MC9'], ['MCBO', 'MCBO'], ['MEET', 'MEET'], ['METF', 'METTLTF'], ['METM', 'METTLTM'], ['MET01', 'MET1'], ['MET02', 'MET2'], ['MET03', 'MET3'], ['MET04', 'MET4'], ['MET05', 'MET5'], ['MET06', 'MET6'], ['MET07', 'MET7'], ['MET08', 'MET8'], ['MET09', 'MET9'], ['MTSR', 'METSR'], ['MT10', 'MT10'], ['MT11', 'MT11'], ['MT12', 'MT12'], ['MT13', 'MT13'], ['MT14', 'MT14'], ['MU01', 'MU1'], ['MU02', 'MU2'], ['MU03', 'MU3'], ['OFCA', 'OFFCAMP'], ['OLC1', 'OLC1'], ['OLC2', 'OLC2'], ['OLC3', 'OLC3'], ['OLC4', 'OLC4'], ['OLC5', 'OLC5'], ['OLC6', 'OLC6'], ['PSTA', 'PAST'], ['PILB', 'PILAB'], ['PRIN', 'PRIN'], ['PWL1', 'PWL1'], ['PWL2', 'PWL2'], ['QDTF', 'QDTLTF'], ['QDTM', 'QDTLTM'], ['SH01', 'SH1'], ['SH02', 'SH2'], ['SH03', 'SH3'], ['SH04', 'SH4'], ['SL01', 'SL'], ['TM01', 'TM1'], ['TPT1', 'TPass'], ['TTC1', 'TTC01'], ['TTC2', 'TTC02'], ['TTC3', 'TTC03'], ['TTC4', 'TTCO4'], ['TW01', 'TW1'], ['TW02', 'TW2'], ['TX01', 'TX1'], ['TX02', 'TX2'], ['UNA', 'UNASSIGNED'], ['VHO', 'VHO'], ['VIL2', 'VIL2']]
+
+
+async def collect(items):
+    return [i async for i in items]
+
+def build_timetable(timetableRaw, teacherlist, rooms, annotator=None):
+    """Raw GetScheduleLinesForDate response -> Lesson records sorted by start time"""
+    if annotator is None:
+        annotator = LessonAnnotator(teacherlist, rooms, locations)
+    return normalize_lessons(timetableRaw['d']['data'], annotator)
+
+async def fetch_timetable(client: AsyncCompass, day):
+    """Login, fetch the day plus staff and rooms at the same time, and build the sorted timetable"""
+    await client.login()
+    # Timetable, staff and rooms don't depend on each other
+    timetableRaw, teacherlist, rooms = await client.gather(client.getTimetable(day), collect(client.iterStaff(fields=['displayCode', 'n'], records=True)), collect(client.iterLocations(fields=['n'], records=True)))
+    return build_timetable(timetableRaw, teacherlist, rooms)
+
+# State kept by refresh_timetable in the worker process: one annotator per school, one ChangeFeed per school and day
+_annotators = {}
+_feeds = {}
+
+async def refresh_timetable(client: AsyncCompass, day):
+    """
+    Fetch the day and return only what changed since the last refresh in this process
+    Staff and rooms are only fetched the first time, unchanged rows aren't re-annotated
+    :return: (fresh, changes), fresh means there was no previous state here so changes add every lesson
+    """
+    if client.user is None:
+        await client.login()
+    school = client.client.schoolSubdomain
+    annotator = _annotators.get(school)
+    if annotator is None:
+        timetableRaw, teacherlist, rooms = await client.gather(client.getTimetable(day), collect(client.iterStaff(fields=['displayCode', 'n'], records=True)), collect(client.iterLocations(fields=['n'], records=True)))
+        annotator = _annotators[school] = LessonAnnotator(teacherlist, rooms, locations)
+    else:
+        timetableRaw = await client.getTimetable(day)
+    feed = _feeds.setdefault((school, day), ChangeFeed())
+    fresh = feed.fresh
+    return fresh, feed.update(timetableRaw['d']['data'], annotator)
+
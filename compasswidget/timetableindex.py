@@ -0,0 +1,73 @@
+import heapq
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta
+
+# Sorted interval index over Lesson records (a day or a whole term)
+# "current", "next" and "at time T" are binary searches, and next_change() says when the answer will
+# change next, so the widget can sleep on one timer until that boundary instead of polling.
+
+
+def _key(day, minutes):
+    return day.toordinal() * 1440 + minutes
+
+
+def _when(key):
+    day, minutes = divmod(key, 1440)
+    return datetime.fromordinal(day) + timedelta(minutes=minutes)
+
+
+class TimetableIndex:
+    def __init__(self, lessons):
+        self.lessons = sorted(lessons, key=lambda l: (l.day, l.start))
+        self.starts = [_key(l.day, l.start) for l in self.lessons]
+
+        # Split time into segments at every start / finish of a running lesson. Within a segment the current
+        # lesson can't change, it's the latest starting running lesson covering it (same rule as before)
+        running = [(self.starts[i], _key(l.day, l.finish), i) for i, l in enumerate(self.lessons) if l.running]
+        bounds = sorted(set([s for s, f, i in running] + [f for s, f, i in running]))
+        self.segments = bounds
+        self.segment_current = []
+        active = []  # Heap of (-start, index, finish)
+        pending = 0
+        for point in bounds:
+            while pending < len(running) and running[pending][0] <= point:
+                start, finish, i = running[pending]
+                heapq.heappush(active, (-start, i, finish))
+                pending += 1
+            while active and active[0][2] <= point:
+                heapq.heappop(active)
+            self.segment_current.append(self.lessons[active[0][1]] if active else None)
+
+        # The answer changes whenever a segment ends or the next lesson to start moves on
+        self.changes = sorted(set(bounds) | set(self.starts))
+
+    @staticmethod
+    def key(when):
+        """datetime -> index key (minutes since 0001-01-01)"""
+        return _key(when.date(), when.hour * 60 + when.minute + (when.second + when.microsecond / 1e6) / 60)
+
+    def current(self, when):
+        """Lesson running at when (the latest starting one if they overlap), or None"""
+        i = bisect_right(self.segments, self.key(when)) - 1
+        return self.segment_current[i] if i >= 0 else None
+
+    at = current
+
+    def next(self, when):
+        """First lesson starting after when, or None"""
+        i = bisect_right(self.starts, self.key(when))
+        return self.lessons[i] if i < len(self.lessons) else None
+
+    def current_and_next(self, when):
+        return self.current(when), self.next(when)
+
+    def next_change(self, when):
+        """The next time current() or next() gives a different answer, or None if they never will"""
+        i = bisect_right(self.changes, self.key(when))
+        return _when(self.changes[i]) if i < len(self.changes) else None
+
+    def between(self, start, end):
+        """Lessons starting in [start, end)"""
+        lo = bisect_left(self.starts, self.key(start))
+        hi = bisect_left(self.starts, self.key(end))
+        return self.lessons[lo:hi]
@@ -0,0 +1,187 @@
+import heapq
+import itertools
+import logging
+import threading
+import time
+from datetime import datetime
+from changefeed import ROOM
+
+# Class transition notifications for many timetables on one thread
+# Every upcoming boundary (lesson starting soon / started / finished) of every account sits in one heap keyed by
+# when it happens, and one thread sleeps until the earliest. Rescheduling a lesson or an account just gives it a
+# new generation number, the old heap entries are skipped when they come up (and compacted away if they pile up).
+
+STARTING = 'starting'  # lead minutes before the start
+STARTED = 'started'
+FINISHED = 'finished'
+ROOM_CHANGED = 'room changed'  # Fired straight away by apply_changes, for lessons that haven't finished
+
+
+def _timestamp(day, minutes):
+    return datetime(day.year, day.month, day.day).timestamp() + minutes * 60
+
+
+class TransitionScheduler:
+    def __init__(self, callback, lead=5, kinds=(STARTING, STARTED, FINISHED, ROOM_CHANGED)):
+        """
+        :param callback: Called as callback(account, kind, lesson, when) on the scheduler thread (or by run_due)
+        :param lead: Minutes before a lesson that STARTING fires
+        :param kinds: Transitions to notify about
+        """
+        self.callback = callback
+        self.lead = lead
+        self.kinds = kinds
+        self._heap = []  # (when, seq, generation, account, lesson key, kind, lesson)
+        self._seq = itertools.count()
+        self._generations = {}  # (account, lesson key) -> generation, entries with any other one are stale
+        self._pending = {}  # (account, lesson key) -> live entries in the heap
+        self._keys = {}  # account -> lesson keys scheduled for it
+        self._stale = 0
+        self._cond = threading.Condition()
+        self._thread = None
+        self._stopping = False
+        self.fired = 0
+
+    def __len__(self):
+        """Live timers"""
+        return len(self._heap) - self._stale
+
+    def _schedule(self, account, lesson, now):
+        id = (account, lesson.key)
+        self._stale += self._pending.pop(id, 0)  # Same key again (Eg. a duplicate row), its earlier entries are dead
+        generation = self._generations[id] = next(self._seq)  # Never reused, so old entries can't come back to life
+        pushed = 0
+        start = _timestamp(lesson.day, lesson.start)
+        for kind in self.kinds:
+            if kind == STARTING:
+                when = start - self.lead * 60
+            elif kind == STARTED:
+                when = start
+            elif kind == FINISHED:
+                when = _timestamp(lesson.day, lesson.finish)
+            else:
+                continue
+            if when > now:
+                heapq.heappush(self._heap, (when, next(self._seq), generation, account, lesson.key, kind, lesson))
+                pushed += 1
+        if pushed:
+            self._pending[id] = pushed
+        else:
+            del self._generations[id]  # Already over
+        return pushed
+
+    def _drop(self, account, key):
+        # Makes every queued entry of the lesson stale
+        id = (account, key)
+        self._generations.pop(id, None)
+        self._stale += self._pending.pop(id, 0)
+
+    def set_lessons(self, account, lessons, now=None):
+        """Replace everything scheduled for an account (Eg. after a full fetch)"""
+        now = time.time() if now is None else now
+        with self._cond:
+            for key in self._keys.pop(account, ()):
+                self._drop(account, key)
+            keys = self._keys[account] = set()
+            for lesson in lessons:
+                if lesson.running and self._schedule(account, lesson, now):
+                    keys.add(lesson.key)
+            self._maybe_compact()
+            self._cond.notify()
+
+    def apply_changes(self, account, changes, now=None):
+        """
+        Reschedule only the lessons a changefeed update touched
+        :param changes: changefeed.Change list for this account
+        """
+        now = time.time() if now is None else now
+        due = []
+        with self._cond:
+            keys = self._keys.setdefault(account, set())
+            for change in changes:
+                if change.key in keys:
+                    self._drop(account, change.key)
+                    keys.discard(change.key)
+                if change.new is not None and change.new.running and self._schedule(account, change.new, now):
+                    keys.add(change.key)
+                if change.kind == ROOM and ROOM_CHANGED in self.kinds and _timestamp(change.new.day, change.new.finish) > now:
+                    due.append((account, ROOM_CHANGED, change.new, now))
+            self._maybe_compact()
+            self._cond.notify()
+        self._fire(due)
+
+    def remove(self, account):
+        with self._cond:
+            for key in self._keys.pop(account, ()):
+                self._drop(account, key)
+            self._maybe_compact()
+
+    def _maybe_compact(self):
+        # Rebuild without stale entries once they're most of the heap, keeps memory proportional to live timers
+        if self._stale > 1024 and self._stale > len(self._heap) // 2:
+            self._heap = [e for e in self._heap if self._generations.get((e[3], e[4])) == e[2]]
+            heapq.heapify(self._heap)
+            self._stale = 0
+
+    def next_due(self):
+        """Unix time of the earliest live timer, or None"""
+        with self._cond:
+            while self._heap and self._generations.get((self._heap[0][3], self._heap[0][4])) != self._heap[0][2]:
+                heapq.heappop(self._heap)
+                self._stale = max(0, self._stale - 1)
+            return self._heap[0][0] if self._heap else None
+
+    def run_due(self, now=None):
+        """Fire every timer due by now, returns how many fired"""
+        now = time.time() if now is None else now
+        due = []
+        with self._cond:
+            while self._heap and self._heap[0][0] <= now:
+                when, _, generation, account, key, kind, lesson = heapq.heappop(self._heap)
+                id = (account, key)
+                if self._generations.get(id) != generation:
+                    self._stale = max(0, self._stale - 1)
+                    continue
+                self._pending[id] -= 1
+                if not self._pending[id]:
+                    # Last boundary of the lesson, forget it
+                    del self._pending[id], self._generations[id]
+                    self._keys[account].discard(key)
+                due.append((account, kind, lesson, when))
+        self._fire(due)  # Outside the lock so callbacks can reschedule
+        return len(due)
+
+    def _fire(self, due):
+        for args in due:
+            try:
+                self.callback(*args)
+            except Exception:
+                # One bad callback mustn't stop the thread (and every notification after it)
+                logging.exception(f"Transitions - Callback failed for {args[0]} ({args[1]})")
+        self.fired += len(due)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if self._stopping:
+                    return
+                when = self.next_due()
+                if when is None or when > time.time():
+                    # Sleeps until the earliest timer, anything scheduled meanwhile notifies and it looks again
+                    self._cond.wait(None if when is None else when - time.time())
+                    continue
+            self.run_due()
+
+    def start(self):
+        """Fire timers on a background thread"""
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name='transitions', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+        if self._thread:
+            self._thread.join()
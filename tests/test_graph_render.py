@@ -0,0 +1,37 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'compasswidget'))
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+QtGui = pytest.importorskip('PyQt6.QtGui')
+QtWidgets = pytest.importorskip('PyQt6.QtWidgets')
+pytest.importorskip('numpy')
+
+from PyQt6.QtCore import QSize
+from PyQt6.QtGui import QColor
+from PyQt6.QtWidgets import QApplication
+
+from graph import Event, TimelineGraph
+
+GREEN = QColor(0, 255, 0)
+BLUE = QColor(0, 0, 255)
+
+
+@pytest.fixture(scope='module')
+def app():
+    return QApplication.instance() or QApplication([])
+
+
+def test_render_below_minimum_size_keeps_whole_day(app):
+    graph = TimelineGraph([Event("First", 8 * 60, 9 * 60, BLUE, BLUE), Event("Last", 16 * 60, 17 * 60, GREEN, GREEN)], mica=False)
+    image = graph.render_image(300, 300, background=QColor(0, 0, 0))
+
+    assert image.size() == QSize(300, 300)
+    # 8:00 - 17:00 fits between the 50px margins, so the first lesson is at the top and the last ends at y 250
+    assert image.pixelColor(150, 60) == BLUE
+    assert image.pixelColor(150, 240) == GREEN
+    assert image.pixelColor(280, 240) != GREEN  # Right edge is the margin, not the middle of a 600px wide layout
+    assert graph.minimumSize() == QSize(600, 400)
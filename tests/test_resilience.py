@@ -0,0 +1,135 @@
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+requests = pytest.importorskip('requests')
+pytest.importorskip('cloudscraper')
+pytest.importorskip('pydantic')
+
+from compasspy.client import Compass
+from compasspy.errors import APIError, CircuitOpenError, RequestFailed
+from compasspy.resilience import CircuitBreaker, RetryPolicy
+
+
+def response(status=200, body=b'{"d": 1}'):
+    x = requests.Response()
+    x.status_code = status
+    x._content = body
+    return x
+
+
+def client(**kwargs):
+    compass = Compass('school', 'cookie', retry=RetryPolicy(attempts=3, baseDelay=0), **kwargs)
+    compass.dt['userId'] = 1
+    return compass
+
+
+def test_half_open_trial_settles_after_other_errors(monkeypatch):
+    compass = client(breakerThreshold=1, breakerResetTimeout=0)
+    outcomes = iter([requests.ConnectTimeout('down')] * 3 + [requests.exceptions.ChunkedEncodingError('cut off'),
+                                                             RuntimeError('clearance check failed'), response()])
+
+    def request(method, path, data=None, **kwargs):
+        outcome = next(outcomes)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+    monkeypatch.setattr(compass, '_request', request)
+
+    with pytest.raises(RequestFailed):
+        compass._json('POST', 'Accounts.svc/GetAccount')
+    breaker = compass.breakers['Accounts.svc/GetAccount']
+    assert breaker.state == CircuitBreaker.OPEN
+
+    # The trial call fails with something that isn't RequestFailed: open again, not stuck half-open
+    with pytest.raises(APIError) as error:
+        compass._json('POST', 'Accounts.svc/GetAccount')
+    assert not isinstance(error.value, (RequestFailed, CircuitOpenError))  # Mapped, not a raw requests error
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(RuntimeError):
+        compass._json('POST', 'Accounts.svc/GetAccount')
+    assert breaker.state == CircuitBreaker.OPEN
+
+    assert compass._json('POST', 'Accounts.svc/GetAccount') == {'d': 1}
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_open_breaker_fails_fast():
+    breaker = CircuitBreaker('endpoint', failureThreshold=2, resetTimeout=60)
+    breaker.failure()
+    breaker.before()
+    breaker.failure()
+    with pytest.raises(CircuitOpenError):
+        breaker.before()
+
+
+def test_reads_are_coalesced_and_retried(monkeypatch):
+    compass = client()
+    sent = []
+
+    def request(method, path, data=None, **kwargs):
+        sent.append(path)
+        time.sleep(0.05)
+        return response(503 if len(sent) == 1 else 200)
+    monkeypatch.setattr(compass, '_request', request)
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(compass._json('POST', 'User.svc/GetAllStaff', {'page': 1})))
+               for _ in range(3)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert results == [{'d': 1}] * 3
+    assert len(sent) == 2  # One request for all three callers, retried once after the 503
+    assert compass.singleFlight.coalesced == 2
+
+
+def test_writes_are_not_coalesced(monkeypatch):
+    compass = client()
+    lock = threading.Lock()
+    sent = []
+
+    def request(method, path, data=None, **kwargs):
+        time.sleep(0.05)
+        with lock:
+            sent.append(data['task']['taskName'])
+            return response(body=f'{{"d": {len(sent)}}}'.encode())
+    monkeypatch.setattr(compass, '_request', request)
+
+    ids = []
+    threads = [threading.Thread(target=lambda: ids.append(compass.saveTask('Buy milk'))) for _ in range(3)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert sent == ['Buy milk'] * 3
+    assert sorted(ids) == [1, 2, 3]
+
+
+def test_writes_only_retry_unsent_requests(monkeypatch):
+    compass = client()
+    outcomes = []
+
+    def request(method, path, data=None, **kwargs):
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+    monkeypatch.setattr(compass, '_request', request)
+
+    # Compass may have saved it before answering 503, so it isn't sent again
+    outcomes[:] = [response(503), response()]
+    with pytest.raises(RequestFailed):
+        compass.saveTask('Buy milk')
+    assert len(outcomes) == 1
+
+    # Never connected, safe to send again
+    outcomes[:] = [requests.ConnectTimeout('connect timed out'), response()]
+    assert compass.saveTask('Buy milk') == 1
+    assert outcomes == []